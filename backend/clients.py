@@ -0,0 +1,54 @@
+"""
+外部サービスクライアントの共有インスタンス
+各クライアントは初回利用時に生成し、以降はプロセス全体で同じインスタンスを再利用する
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from pinecone import Pinecone
+from supabase import create_client, Client, ClientOptions
+
+# 環境変数を読み込み（backend/.env → プロジェクトルートの.env の順）
+load_dotenv()
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+# Supabase API呼び出しのタイムアウト（接続確立は短めに打ち切る）
+SUPABASE_HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+@lru_cache(maxsize=1)
+def get_supabase() -> Optional[Client]:
+    """
+    Supabaseクライアントを取得（設定がない場合はNone）
+
+    PostgREST/Storageのhttpxセッションはクライアント内で保持されるため、
+    同じインスタンスを共有することでkeep-alive接続がリクエスト間で再利用される
+    """
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_anon_key = os.getenv("SUPABASE_ANON_KEY")
+    if not (supabase_url and supabase_anon_key):
+        return None
+
+    return create_client(
+        supabase_url,
+        supabase_anon_key,
+        options=ClientOptions(
+            postgrest_client_timeout=SUPABASE_HTTP_TIMEOUT,
+            storage_client_timeout=SUPABASE_HTTP_TIMEOUT,
+        ),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_pinecone() -> Optional[Pinecone]:
+    """Pineconeクライアントを取得（APIキーがない場合はNone）"""
+    pinecone_api_key = os.getenv("PINECONE_API_KEY")
+    if not pinecone_api_key:
+        return None
+
+    return Pinecone(api_key=pinecone_api_key)
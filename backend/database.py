@@ -4,57 +4,219 @@ Supabaseクライアントを優先し、SQLAlchemyをフォールバックと
 """
 
 import os
+import uuid
+import logging
+import asyncio
+from functools import lru_cache
+from urllib.parse import urlparse
 from typing import Optional, Dict, Any, List
-from supabase import create_client
-from sqlalchemy import create_engine, text
+from sqlalchemy import text, table, column, insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.pool import NullPool
+from psycopg_pool import AsyncConnectionPool
 from dotenv import load_dotenv
 
+from clients import get_supabase
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+# Supavisorのトランザクションモードのポート（プリペアドステートメントを使えない）
+SUPAVISOR_TRANSACTION_PORT = 6543
+
+# 直接接続時に接続ごとに保持するプリペアドステートメント数
+PREPARED_STATEMENT_CACHE_SIZE = 1024
+
+
+def to_async_database_url(database_url: str) -> str:
+    """DATABASE_URLをasyncpgドライバ指定のURLに変換"""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if database_url.startswith(prefix):
+            return "postgresql+asyncpg://" + database_url[len(prefix):]
+    return database_url
+
+
+def uses_transaction_pooler(database_url: str) -> bool:
+    """DATABASE_URLがSupabaseのトランザクションモードpooler（ポート6543）を指しているか"""
+    return urlparse(database_url).port == SUPAVISOR_TRANSACTION_PORT
+
+
+def create_database_engine(database_url: str, **kwargs: Any) -> AsyncEngine:
+    """
+    asyncpgを使った非同期SQLAlchemyエンジンを作成
+
+    Supabaseのトランザクションモードpooler（Supavisor, ポート6543）経由の場合は、
+    プーリングはpooler側に任せてSQLAlchemy側はNullPoolとし、
+    サーバー接続をまたいで衝突するプリペアドステートメントのキャッシュは無効化する。
+    直接接続・セッションモード（ポート5432）の場合は接続をプールし、
+    プリペアドステートメントを接続ごとにキャッシュして解析・実行計画の作成を省く。
+    """
+    connect_args: Dict[str, Any] = {
+        "timeout": 30,  # 接続タイムアウト30秒
+        "ssl": "require",  # SSL接続を必須に
+        "server_settings": {"jit": "off"},
+    }
+
+    if uses_transaction_pooler(database_url):
+        connect_args.update({
+            "statement_cache_size": 0,  # asyncpgのステートメントキャッシュを無効化
+            "prepared_statement_cache_size": 0,  # SQLAlchemy側のキャッシュも無効化
+            # 名前付きプリペアドステートメントの重複（already exists）を避ける
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        })
+        kwargs.setdefault("poolclass", NullPool)
+    else:
+        connect_args.update({
+            "statement_cache_size": PREPARED_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": PREPARED_STATEMENT_CACHE_SIZE,
+        })
+        kwargs.setdefault("pool_size", 10)
+        kwargs.setdefault("max_overflow", 10)
+        # サーバー側で切断されたアイドル接続を使い回さないよう5分で作り直す
+        kwargs.setdefault("pool_recycle", 300)
+        kwargs.setdefault("pool_pre_ping", True)
+
+    return create_async_engine(
+        to_async_database_url(database_url),
+        connect_args=connect_args,
+        **kwargs,
+    )
+
+
+# 一括INSERT時の1ステートメントあたりの最大行数（ワイヤーメッセージサイズ制限対策）
+BULK_INSERT_CHUNK_SIZE = 1000
+
+# この行数以上の一括登録はCOPYを使う（少量では複数行INSERTの方が速い）
+COPY_MIN_ROWS = 500
+
+# 一括INSERT用の軽量テーブル定義（SQLAlchemy Core）
+business_requests_table = table(
+    "business_requests",
+    column("id"),
+    column("title"),
+    column("description"),
+    column("status"),
+    column("created_at"),
+)
+
+uploaded_files_table = table(
+    "uploaded_files",
+    column("id"),
+    column("business_request_id"),
+    column("original_filename"),
+    column("file_size"),
+    column("file_type"),
+    column("storage_path"),
+    column("upload_status"),
+    column("created_at"),
+)
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> Optional[AsyncEngine]:
+    """共有SQLAlchemyエンジンを取得（DATABASE_URLがない場合はNone）"""
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        return None
+
+    # SQLログ出力は同期的にフォーマット・書き込みされるため、明示的に有効化した場合のみ
+    return create_database_engine(database_url, echo=os.getenv("SQL_ECHO") == "1")
+
+
+@lru_cache(maxsize=1)
+def get_direct_pool() -> Optional[AsyncConnectionPool]:
+    """
+    psycopg（v3）の直接接続用非同期コネクションプールを取得（DATABASE_URLがない場合はNone）
+
+    TLSセッションを含む接続をリクエスト間で再利用し、毎回のハンドシェイクを避ける。
+    プールは未オープンの状態で生成するため、利用前に open_direct_pool を呼ぶ
+    """
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        return None
+
+    return AsyncConnectionPool(
+        database_url,
+        min_size=1,
+        max_size=10,
+        open=False,
+        kwargs={
+            "connect_timeout": 30,
+            "sslmode": "require",
+            # トランザクションモードpoolerでは自動プリペアが衝突するため無効化
+            "prepare_threshold": None,
+        },
+    )
+
+
+async def open_direct_pool() -> Optional[AsyncConnectionPool]:
+    """直接接続用コネクションプールを開いて返す（オープン済みの場合はそのまま）"""
+    pool = get_direct_pool()
+    if pool is not None:
+        await pool.open()
+    return pool
+
+
+async def close_direct_pool() -> None:
+    """直接接続用コネクションプールを閉じる（未生成の場合は何もしない）"""
+    if get_direct_pool.cache_info().currsize == 0:
+        return
+
+    pool = get_direct_pool()
+    if pool is not None:
+        await pool.close()
+    get_direct_pool.cache_clear()
+
+
+def rows_to_dicts(result) -> List[Dict[str, Any]]:
+    """
+    クエリ結果を辞書のリストに変換
+
+    RowMappingはorjsonで直接シリアライズできないため、
+    列名と値のタプルから1行につき辞書1つだけを生成する
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
 class DatabaseManager:
     def __init__(self):
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_anon_key = os.getenv("SUPABASE_ANON_KEY")
         self.database_url = os.getenv("DATABASE_URL")
-        
-        # Supabaseクライアントの初期化
-        if self.supabase_url and self.supabase_anon_key:
-            self.supabase = create_client(self.supabase_url, self.supabase_anon_key)
-        else:
-            self.supabase = None
-        
-        # SQLAlchemyエンジンの初期化（フォールバック用）
-        if self.database_url:
-            self.engine = create_engine(
-                self.database_url,
-                pool_pre_ping=True,
-                pool_recycle=300,
-                connect_args={
-                    "connect_timeout": 30,
-                    "sslmode": "require"
-                }
-            )
-        else:
-            self.engine = None
+
+    @property
+    def supabase(self):
+        """Supabaseクライアント（初回アクセス時に生成）"""
+        return get_supabase()
+
+    @property
+    def engine(self) -> Optional[AsyncEngine]:
+        """SQLAlchemyエンジン（フォールバック用、初回アクセス時に生成）"""
+        return get_engine()
     
-    def test_connection(self) -> Dict[str, Any]:
+    async def test_connection(self) -> Dict[str, Any]:
         """接続テストを実行"""
         if self.supabase:
             try:
                 # Supabaseクライアントでテスト
-                response = self.supabase.table('business_requests').select('*').limit(1).execute()
+                response = await asyncio.to_thread(
+                    self.supabase.table('business_requests').select('*').limit(1).execute
+                )
                 return {
                     "status": "success",
                     "method": "Supabase Client",
                     "url": self.supabase_url
                 }
             except Exception as e:
-                print(f"Supabase client test failed: {e}")
+                logger.warning("Supabase client test failed: %s", e)
         
         if self.engine:
             try:
-                with self.engine.connect() as connection:
-                    result = connection.execute(text("SELECT 1"))
+                async with self.engine.connect() as connection:
+                    result = await connection.execute(text("SELECT 1"))
                     result.fetchone()
                     return {
                         "status": "success",
@@ -62,7 +224,7 @@ class DatabaseManager:
                         "url": self.database_url
                     }
             except Exception as e:
-                print(f"SQLAlchemy test failed: {e}")
+                logger.warning("SQLAlchemy test failed: %s", e)
         
         return {
             "status": "failed",
@@ -70,89 +232,94 @@ class DatabaseManager:
             "error": "No working database connection available"
         }
     
-    def create_business_request(self, title: str, description: Optional[str] = None) -> Dict[str, Any]:
+    async def create_business_request(self, title: str, description: Optional[str] = None) -> Dict[str, Any]:
         """新しいビジネスリクエストを作成"""
         if self.supabase:
             try:
-                response = self.supabase.table('business_requests').insert({
-                    'title': title,
-                    'description': description,
-                    'status': 'pending'
-                }).execute()
+                response = await asyncio.to_thread(
+                    self.supabase.table('business_requests').insert({
+                        'title': title,
+                        'description': description,
+                        'status': 'pending'
+                    }).execute
+                )
                 return {"status": "success", "data": response.data, "method": "Supabase"}
             except Exception as e:
-                print(f"Supabase insert failed: {e}")
+                logger.warning("Supabase insert failed: %s", e)
         
         if self.engine:
             try:
-                with self.engine.connect() as connection:
-                    result = connection.execute(text("""
+                async with self.engine.connect() as connection:
+                    result = await connection.execute(text("""
                         INSERT INTO business_requests (title, description, status)
                         VALUES (:title, :description, 'pending')
                         RETURNING id, title, description, status, created_at
                     """), {"title": title, "description": description})
-                    connection.commit()
-                    row = result.fetchone()
+                    await connection.commit()
+                    rows = rows_to_dicts(result)
                     return {
                         "status": "success",
-                        "data": dict(row._mapping) if row else None,
+                        "data": rows[0] if rows else None,
                         "method": "SQLAlchemy"
                     }
             except Exception as e:
-                print(f"SQLAlchemy insert failed: {e}")
+                logger.warning("SQLAlchemy insert failed: %s", e)
         
         return {"status": "failed", "error": "No working database connection available"}
     
-    def get_business_requests(self, limit: int = 100) -> Dict[str, Any]:
+    async def get_business_requests(self, limit: int = 100) -> Dict[str, Any]:
         """ビジネスリクエスト一覧を取得"""
         if self.supabase:
             try:
-                response = self.supabase.table('business_requests').select('*').limit(limit).execute()
+                response = await asyncio.to_thread(
+                    self.supabase.table('business_requests').select('*').limit(limit).execute
+                )
                 return {"status": "success", "data": response.data, "method": "Supabase"}
             except Exception as e:
-                print(f"Supabase select failed: {e}")
+                logger.warning("Supabase select failed: %s", e)
         
         if self.engine:
             try:
-                with self.engine.connect() as connection:
-                    result = connection.execute(text("""
+                async with self.engine.connect() as connection:
+                    result = await connection.execute(text("""
                         SELECT id, title, description, status, created_at, updated_at
                         FROM business_requests
                         ORDER BY created_at DESC
                         LIMIT :limit
                     """), {"limit": limit})
-                    rows = result.fetchall()
                     return {
                         "status": "success",
-                        "data": [dict(row._mapping) for row in rows],
+                        "data": rows_to_dicts(result),
                         "method": "SQLAlchemy"
                     }
             except Exception as e:
-                print(f"SQLAlchemy select failed: {e}")
+                logger.warning("SQLAlchemy select failed: %s", e)
         
         return {"status": "failed", "error": "No working database connection available"}
     
-    def create_uploaded_file(self, business_request_id: str, filename: str, 
+    async def create_uploaded_file(self, business_request_id: str, filename: str, 
                            file_size: int, file_type: str, storage_path: str) -> Dict[str, Any]:
         """アップロードファイル情報を作成"""
         if self.supabase:
             try:
-                response = self.supabase.table('uploaded_files').insert({
-                    'business_request_id': business_request_id,
-                    'original_filename': filename,
-                    'file_size': file_size,
-                    'file_type': file_type,
-                    'storage_path': storage_path,
-                    'upload_status': 'uploaded'
-                }).execute()
+                response = await asyncio.to_thread(
+                    self.supabase.table('uploaded_files').insert({
+                        'business_request_id': business_request_id,
+                        'original_filename': filename,
+                        'file_size': file_size,
+                        'file_type': file_type,
+                        'storage_path': storage_path,
+                        'upload_status': 'uploaded'
+                    }).execute
+                )
                 return {"status": "success", "data": response.data, "method": "Supabase"}
             except Exception as e:
-                print(f"Supabase file insert failed: {e}")
+                logger.warning("Supabase file insert failed: %s", e)
         
         if self.engine:
             try:
-                with self.engine.connect() as connection:
-                    result = connection.execute(text("""
+                async with self.engine.connect() as connection:
+                    result = await connection.execute(text("""
                         INSERT INTO uploaded_files 
                         (business_request_id, original_filename, file_size, file_type, storage_path, upload_status)
                         VALUES (:business_request_id, :filename, :file_size, :file_type, :storage_path, 'uploaded')
@@ -164,17 +331,104 @@ class DatabaseManager:
                         "file_type": file_type,
                         "storage_path": storage_path
                     })
-                    connection.commit()
-                    row = result.fetchone()
+                    await connection.commit()
+                    rows = rows_to_dicts(result)
                     return {
                         "status": "success",
-                        "data": dict(row._mapping) if row else None,
+                        "data": rows[0] if rows else None,
                         "method": "SQLAlchemy"
                     }
             except Exception as e:
-                print(f"SQLAlchemy file insert failed: {e}")
+                logger.warning("SQLAlchemy file insert failed: %s", e)
         
         return {"status": "failed", "error": "No working database connection available"}
 
+    async def create_business_requests_bulk(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ビジネスリクエストを一括作成（複数行を1回のINSERTで登録）"""
+        rows = [{"status": "pending", **row} for row in rows]
+        return await self._bulk_insert(business_requests_table, rows)
+
+    async def create_uploaded_files_bulk(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """アップロードファイル情報を一括作成（複数行を1回のINSERTで登録）"""
+        rows = [{"upload_status": "uploaded", **row} for row in rows]
+        return await self._bulk_insert(uploaded_files_table, rows)
+
+    async def copy_uploaded_files(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        アップロードファイル情報をCOPYで一括登録
+
+        COPY_MIN_ROWS行未満の場合やCOPYが使えない場合は複数行INSERTで登録する。
+        COPYはRETURNINGを持たないため、返却データは登録した行そのもの
+        """
+        if len(rows) < COPY_MIN_ROWS or not self.engine:
+            return await self.create_uploaded_files_bulk(rows)
+
+        rows = [{"upload_status": "uploaded", **row} for row in rows]
+        columns = list(rows[0].keys())
+        records = [tuple(row.get(name) for name in columns) for row in rows]
+
+        try:
+            async with self.engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                # SQL文の解析を経ないCOPY FROM STDINで送信（asyncpgの接続を直接使用）
+                await raw_connection.driver_connection.copy_records_to_table(
+                    uploaded_files_table.name, records=records, columns=columns
+                )
+            return {"status": "success", "data": rows, "method": "COPY"}
+        except Exception as e:
+            logger.warning("COPY insert failed: %s", e)
+
+        return await self.create_uploaded_files_bulk(rows)
+
+    async def _bulk_insert(self, target_table, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """BULK_INSERT_CHUNK_SIZE行ごとに複数行INSERTを実行"""
+        if not rows:
+            return {"status": "success", "data": [], "method": "None"}
+
+        chunks = [
+            rows[i : i + BULK_INSERT_CHUNK_SIZE]
+            for i in range(0, len(rows), BULK_INSERT_CHUNK_SIZE)
+        ]
+
+        # Supabaseはチャンクごとに確定するため、登録済みのチャンクはフォールバックで再登録しない
+        data = []
+        inserted_chunks = 0
+        if self.supabase:
+            try:
+                for chunk in chunks:
+                    response = await asyncio.to_thread(
+                        self.supabase.table(target_table.name).insert(chunk).execute
+                    )
+                    data.extend(response.data)
+                    inserted_chunks += 1
+                return {"status": "success", "data": data, "method": "Supabase"}
+            except Exception as e:
+                logger.warning(
+                    "Supabase bulk insert failed after %d/%d chunks: %s",
+                    inserted_chunks,
+                    len(chunks),
+                    e,
+                )
+
+        if self.engine:
+            try:
+                async with self.engine.connect() as connection:
+                    remaining_data = []
+                    for chunk in chunks[inserted_chunks:]:
+                        result = await connection.execute(
+                            insert(target_table).values(chunk).returning(*target_table.c)
+                        )
+                        remaining_data.extend(rows_to_dicts(result))
+                    await connection.commit()
+                    return {
+                        "status": "success",
+                        "data": data + remaining_data,
+                        "method": "Supabase+SQLAlchemy" if inserted_chunks else "SQLAlchemy",
+                    }
+            except Exception as e:
+                logger.warning("SQLAlchemy bulk insert failed: %s", e)
+
+        return {"status": "failed", "error": "No working database connection available"}
+
 # グローバルインスタンス
 db_manager = DatabaseManager()
\ No newline at end of file
@@ -1,21 +1,21 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from pinecone import Pinecone
+from sqlalchemy import text, bindparam
 from routers import upload, excel_parser, journal_data
-from database import db_manager
+from database import db_manager, get_engine, open_direct_pool, close_direct_pool
 import os
-import psycopg2
-import time
-from urllib.parse import urlparse
-from supabase import create_client
-from typing import cast, Any
+import logging
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from clients import get_supabase, get_pinecone
+from utils.cache_utils import async_ttl_cache
+from utils.logging_utils import setup_logging, shutdown_logging
+from typing import cast, Any, Dict, FrozenSet, Optional, Tuple
 
-# 環境変数を読み込み
-load_dotenv(".env")  # 最初にバックエンドディレクトリの.envを試行
-if not os.getenv("GOOGLE_API_KEY"):
-    load_dotenv("../.env")  # プロジェクトルートの.envを試行
+# 環境変数の読み込みとクライアント生成はclients.pyに集約（import時に読み込み済み）
+
+logger = logging.getLogger(__name__)
 
 # 型チェックのためのAnyタイプ（import時の問題を回避）
 # Supabaseライブラリの型定義が不完全または見つからない場合にAnyを使用
@@ -24,40 +24,112 @@ CountMethodType = Any
 # データベース接続の設定
 DATABASE_URL = os.getenv("DATABASE_URL")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-
-if DATABASE_URL:
-    # 接続プールとタイムアウトの設定を追加
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,  # 接続の有効性をチェック
-        pool_recycle=300,  # 5分で接続をリサイクル
-        connect_args={
-            "connect_timeout": 30,  # 接続タイムアウト30秒
-            "sslmode": "require",  # SSL接続を必須に
-        },
-        echo=True,  # デバッグ用にSQLを出力
+
+# 接続テスト結果のキャッシュ時間（秒）
+# ロードバランサーやliveness probeからの連続アクセスを1回の実クエリにまとめる
+DB_PROBE_CACHE_TTL = 5
+PINECONE_PROBE_CACHE_TTL = 60  # インデックス一覧はほとんど変化しないため長め
+
+# 接続テストで存在を確認するテーブル
+PROBE_TABLES = ("business_requests", "uploaded_files")
+
+# 起動時に確認した存在テーブル（information_schemaの参照は重いため毎リクエストでは行わない）
+AVAILABLE_TABLES: FrozenSet[str] = frozenset()
+
+# Supabase/Pinecone/SQLAlchemyの各クライアントは get_supabase / get_pinecone / get_engine で
+# 遅延生成し、起動時のlifespanで事前に生成・接続しておく
+
+
+async def load_available_tables(connection) -> FrozenSet[str]:
+    """PROBE_TABLESのうちpublicスキーマに存在するテーブルを取得"""
+    result = await connection.execute(
+        text(
+            """
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = 'public'
+            AND table_name IN :table_names
+        """
+        ).bindparams(bindparam("table_names", expanding=True)),
+        {"table_names": list(PROBE_TABLES)},
+    )
+    return frozenset(row[0] for row in result)
+
+
+async def approx_row_counts(connection, table_names) -> Dict[str, int]:
+    """
+    pg_class.reltuples（プランナーの推定行数）からテーブルの件数を取得
+
+    COUNT(*)のような全件走査を行わないため、テーブルサイズに関係なく一定時間で返る。
+    一度もANALYZEされていないテーブル（reltuples = -1）は0件として扱う
+    """
+    result = await connection.execute(
+        text(
+            """
+            SELECT c.relname, c.reltuples::bigint
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+            AND c.relname IN :table_names
+        """
+        ).bindparams(bindparam("table_names", expanding=True)),
+        {"table_names": list(table_names)},
+    )
+    counts = {name: max(int(count), 0) for name, count in result}
+    return {name: counts.get(name, 0) for name in table_names}
+
+
+async def warm_up_connections() -> None:
+    """DB接続とPinecone/SupabaseのHTTPSセッションを事前に確立する"""
+    global AVAILABLE_TABLES
+
+    engine = get_engine()
+    if engine:
+        try:
+            async with engine.connect() as connection:
+                AVAILABLE_TABLES = await load_available_tables(connection)
+        except Exception as e:
+            logger.warning("Database warm-up failed: %s", e)
+
+    pc = get_pinecone()
+    if pc:
+        try:
+            await asyncio.to_thread(pc.list_indexes)
+        except Exception as e:
+            logger.warning("Pinecone warm-up failed: %s", e)
+
+    # Supabaseクライアントの生成のみ（接続は初回リクエスト時に確立される）
+    get_supabase()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時に接続を温め、終了時に接続プールを解放する"""
+    setup_logging()
+    await warm_up_connections()
+    # 期限切れセッションの掃除はリクエスト処理から切り離して定期的に行う
+    session_cleanup_task = asyncio.create_task(
+        excel_parser.session_manager.run_cleanup_loop()
     )
-else:
-    engine = None
-
-# Supabaseクライアントの設定
-if SUPABASE_URL and SUPABASE_ANON_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-else:
-    supabase = None
-
-# Pinecone接続の設定
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-if PINECONE_API_KEY:
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-else:
-    pc = None
+    yield
+
+    session_cleanup_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await session_cleanup_task
+    await close_direct_pool()
+    engine = get_engine()
+    if engine:
+        await engine.dispose()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="Excel Matching API",
     description="Excel file matching and analysis API",
     version="1.0.0",
+    lifespan=lifespan,
+    # レスポンスのJSONエンコードはorjsonで行う（標準jsonより高速）
+    default_response_class=ORJSONResponse,
 )
 
 # CORSの設定（フロントエンドからのアクセスを許可）
@@ -79,6 +151,30 @@ app.include_router(excel_parser.router)
 app.include_router(journal_data.router)
 
 
+def count_table_rows(supabase, table_name: str) -> Optional[int]:
+    """
+    テーブルの件数を行データなしで取得
+
+    HEADリクエストで本文を返さず、件数はCOUNT(*)の全件走査ではなく
+    PostgreSQLのプランナー推定値（estimated）を使用する
+    """
+    response = (
+        supabase.table(table_name)
+        .select("id", count=cast(CountMethodType, "estimated"), head=True)
+        .limit(0)
+        .execute()
+    )
+    return response.count
+
+
+async def count_probe_tables(supabase) -> Tuple[Optional[int], Optional[int]]:
+    """business_requests / uploaded_files の件数を並列に取得"""
+    return await asyncio.gather(
+        asyncio.to_thread(count_table_rows, supabase, "business_requests"),
+        asyncio.to_thread(count_table_rows, supabase, "uploaded_files"),
+    )
+
+
 @app.get("/")
 async def root():
     """ルートエンドポイント"""
@@ -92,33 +188,32 @@ async def health_check():
 
 
 @app.get("/db-test")
+@async_ttl_cache(DB_PROBE_CACHE_TTL)
 async def test_database_connection():
     """データベース接続テストエンドポイント（Supabaseクライアント優先）"""
+    global AVAILABLE_TABLES
+
+    supabase = get_supabase()
+    engine = get_engine()
+
     # まずSupabaseクライアントを試す
     if supabase:
         try:
-            # Supabaseクライアントでテスト（型チェックを無視）
-            response = (
-                supabase.table("business_requests")
-                .select("*", count=cast(CountMethodType, "exact"))
-                .execute()
-            )
-            files_response = (
-                supabase.table("uploaded_files")
-                .select("*", count=cast(CountMethodType, "exact"))
-                .execute()
+            # Supabaseクライアントでテスト（行データは取得せず件数のみ、2テーブルを並列に取得）
+            business_requests_count, uploaded_files_count = await count_probe_tables(
+                supabase
             )
 
             return {
                 "status": "success",
                 "message": "Database connection successful (Supabase Client)",
                 "connection_method": "Supabase Python Client",
-                "business_requests_count": response.count,
-                "uploaded_files_count": files_response.count,
+                "business_requests_count": business_requests_count,
+                "uploaded_files_count": uploaded_files_count,
                 "supabase_url": SUPABASE_URL,
             }
         except Exception as supabase_error:
-            print(f"Supabase client failed: {supabase_error}")
+            logger.warning("Supabase client failed: %s", supabase_error)
             # Supabaseクライアントが失敗した場合はSQLAlchemyを試す
             pass
 
@@ -130,10 +225,10 @@ async def test_database_connection():
         )
 
     try:
-        print(f"Attempting SQLAlchemy connection at: {time.time()}")
+        logger.debug("Attempting SQLAlchemy connection")
 
-        with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1 as test"))
+        async with engine.connect() as connection:
+            result = await connection.execute(text("SELECT 1 as test"))
             row = result.fetchone()
 
             if row is None:
@@ -141,18 +236,13 @@ async def test_database_connection():
 
             test_value = row[0]
 
-            # テーブル存在確認
-            table_check = connection.execute(
-                text(
-                    """
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name IN ('business_requests', 'uploaded_files')
-            """
-                )
-            )
-            tables = [row[0] for row in table_check.fetchall()]
+            # テーブル存在確認（起動時の結果を使い、未取得の場合のみ問い合わせる）
+            if not AVAILABLE_TABLES:
+                AVAILABLE_TABLES = await load_available_tables(connection)
+            tables = sorted(AVAILABLE_TABLES)
+
+            # 件数は推定値（Supabaseクライアント経由のcount="estimated"と同等）
+            counts = await approx_row_counts(connection, PROBE_TABLES)
 
             return {
                 "status": "success",
@@ -160,136 +250,121 @@ async def test_database_connection():
                 "connection_method": "SQLAlchemy",
                 "test_query_result": test_value,
                 "available_tables": tables,
+                "business_requests_count": counts["business_requests"],
+                "uploaded_files_count": counts["uploaded_files"],
             }
     except Exception as e:
         error_msg = (
             f"All database connection methods failed. SQLAlchemy error: {str(e)}"
         )
-        print(f"Error at: {time.time()} - {error_msg}")
+        logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+async def run_direct_probe() -> Dict[str, Any]:
+    """psycopgの非同期直接接続で接続テストクエリを実行"""
+    # プールから接続を取得（TLSセッションを再利用）
+    pool = await open_direct_pool()
+
+    async with pool.connection() as connection:
+        logger.debug("Direct connection established")
+
+        async with connection.cursor() as cursor:
+            # 基本テストクエリ
+            await cursor.execute("SELECT 1 as test")
+            result = await cursor.fetchone()
+            test_value = result[0] if result else None
+
+            # データベース情報取得
+            await cursor.execute("SELECT version()")
+            version_result = await cursor.fetchone()
+            db_version = version_result[0] if version_result else "Unknown"
+
+        info = connection.info
+
+    return {
+        "test_query_result": test_value,
+        # テーブルの存在は起動時に確認した結果を返す（information_schemaは毎回参照しない）
+        "available_tables": sorted(AVAILABLE_TABLES),
+        "database_version": db_version,
+        "connection_info": {
+            "host": info.host,
+            "port": info.port,
+            "database": info.dbname,
+            "user": info.user,
+        },
+    }
+
+
 @app.get("/db-test-direct")
+@async_ttl_cache(DB_PROBE_CACHE_TTL)
 async def test_database_connection_direct():
-    """psycopg2を使った直接データベース接続テスト"""
+    """psycopg（非同期）を使った直接データベース接続テスト"""
     if not DATABASE_URL:
         raise HTTPException(status_code=500, detail="Database URL not configured")
 
     try:
-        print(f"Attempting direct connection to database at: {time.time()}")
-
-        # URL解析
-        parsed = urlparse(DATABASE_URL)
-
-        # psycopg2で直接接続
-        connection = psycopg2.connect(
-            host=parsed.hostname,
-            port=parsed.port,
-            database=parsed.path[1:],  # "/"を除去
-            user=parsed.username,
-            password=parsed.password,
-            connect_timeout=30,
-            sslmode="require",
-        )
+        logger.debug("Attempting direct connection to database")
 
-        print(f"Direct connection established at: {time.time()}")
+        probe = await run_direct_probe()
 
-        cursor = connection.cursor()
-
-        # 基本テストクエリ
-        cursor.execute("SELECT 1 as test")
-        result = cursor.fetchone()
-        test_value = result[0] if result else None
-
-        # テーブル存在確認
-        cursor.execute(
-            """
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name IN ('business_requests', 'uploaded_files')
-        """
-        )
-        tables = [row[0] for row in cursor.fetchall()]
-
-        # データベース情報取得
-        cursor.execute("SELECT version()")
-        version_result = cursor.fetchone()
-        db_version = version_result[0] if version_result else "Unknown"
-
-        cursor.close()
-        connection.close()
-
-        print(f"Direct query completed at: {time.time()}")
+        logger.debug("Direct query completed")
 
         return {
             "status": "success",
             "message": "Direct database connection successful",
-            "test_query_result": test_value,
-            "available_tables": tables,
-            "database_version": db_version,
-            "connection_info": {
-                "host": parsed.hostname,
-                "port": parsed.port,
-                "database": parsed.path[1:],
-                "user": parsed.username,
-            },
+            **probe,
         }
 
     except Exception as e:
         error_msg = f"Direct database connection failed: {str(e)}"
-        print(f"Direct connection error at: {time.time()} - {error_msg}")
+        logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
 @app.get("/db-test-supabase")
+@async_ttl_cache(DB_PROBE_CACHE_TTL)
 async def test_database_connection_supabase():
     """Supabaseクライアントを使った接続テスト"""
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(status_code=500, detail="Supabase client not configured")
 
     try:
-        print(f"Attempting Supabase client connection at: {time.time()}")
-
-        # テーブル一覧取得でテスト（型チェックを無視）
-        response = (
-            supabase.table("business_requests")
-            .select("*", count=cast(CountMethodType, "exact"))
-            .execute()
-        )
-        print(f"Supabase query completed at: {time.time()}")
+        logger.debug("Attempting Supabase client connection")
 
-        # uploaded_filesテーブルも確認
-        files_response = (
-            supabase.table("uploaded_files")
-            .select("*", count=cast(CountMethodType, "exact"))
-            .execute()
+        # 件数取得でテスト（行データは取得しない、2テーブルを並列に取得）
+        business_requests_count, uploaded_files_count = await count_probe_tables(
+            supabase
         )
+        logger.debug("Supabase query completed")
 
         return {
             "status": "success",
             "message": "Supabase client connection successful",
-            "business_requests_count": response.count,
-            "uploaded_files_count": files_response.count,
+            "business_requests_count": business_requests_count,
+            "uploaded_files_count": uploaded_files_count,
             "supabase_url": SUPABASE_URL,
             "connection_method": "Supabase Python Client",
         }
 
     except Exception as e:
         error_msg = f"Supabase client connection failed: {str(e)}"
-        print(f"Supabase connection error at: {time.time()} - {error_msg}")
+        logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
 @app.get("/pinecone-test")
+@async_ttl_cache(PINECONE_PROBE_CACHE_TTL)
 async def test_pinecone_connection():
     """Pinecone接続テストエンドポイント"""
+    pc = get_pinecone()
     if not pc:
         raise HTTPException(status_code=500, detail="Pinecone API key not configured")
 
     try:
-        # インデックス一覧を取得して接続確認
-        indexes = pc.list_indexes()
+        # インデックス一覧を取得して接続確認（ブロッキングI/Oのためスレッドプールで実行）
+        indexes = await asyncio.to_thread(pc.list_indexes)
         return {
             "status": "success",
             "message": "Pinecone connection successful",
@@ -302,9 +377,10 @@ async def test_pinecone_connection():
 
 
 @app.get("/db-simple-test")
+@async_ttl_cache(DB_PROBE_CACHE_TTL)
 async def simple_database_test():
     """シンプルなデータベース接続テスト"""
-    result = db_manager.test_connection()
+    result = await db_manager.test_connection()
     if result["status"] == "success":
         return result
     else:
@@ -316,9 +392,12 @@ async def simple_database_test():
 @app.get("/business-requests")
 async def get_business_requests():
     """ビジネスリクエスト一覧取得"""
-    result = db_manager.get_business_requests()
+    result = await db_manager.get_business_requests()
     if result["status"] == "success":
-        return {"status": "success", "data": result["data"], "method": result["method"]}
+        # 行数が多くなるためjsonable_encoderを通さず、orjsonで直接シリアライズする
+        return ORJSONResponse(
+            {"status": "success", "data": result["data"], "method": result["method"]}
+        )
     else:
         raise HTTPException(
             status_code=500,
@@ -330,7 +409,7 @@ async def get_business_requests():
 async def create_business_request(title: str, description: str = ""):
     """新しいビジネスリクエストを作成"""
     desc = description if description else None
-    result = db_manager.create_business_request(title, desc)
+    result = await db_manager.create_business_request(title, desc)
     if result["status"] == "success":
         return {"status": "success", "data": result["data"], "method": result["method"]}
     else:
@@ -343,4 +422,15 @@ async def create_business_request(title: str, description: str = ""):
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop/httpの"auto"はuvloop・httptoolsがインストールされていればそれらを使う
+    # （Windowsではuvloopが使えないため標準のasyncio/h11にフォールバック）
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        # セッション・キャッシュはプロセス内に保持するため既定は1ワーカー
+        # （複数ワーカーにはプロセス外のセッションストアが必要）
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+    )
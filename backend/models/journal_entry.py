@@ -1,17 +1,22 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import (
+    BaseModel,
+    Field,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
+import csv
+import sys
 from datetime import datetime
-from typing import Optional, ClassVar, Dict
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from typing import Optional, ClassVar, Dict, FrozenSet, List, Tuple
 
 
-class JournalEntry(BaseModel):
-    """
-    会計仕訳データモデル
-    実際のCSVファイルの18項目レイアウトに基づいて定義
-    """
-
-    # CSVカラム名から英語フィールド名へのマッピング
-    CSV_FIELD_MAPPING: ClassVar[Dict[str, str]] = {
+# CSVカラム名から英語フィールド名へのマッピング
+# キーをinternしておき、internしたCSVヘッダーとの照合を同一オブジェクト比較で済ませる
+JOURNAL_CSV_FIELD_MAPPING: Dict[str, str] = {
+    sys.intern(japanese_key): english_key
+    for japanese_key, english_key in {
         "日付": "date",
         "仕訳番号": "journal_number",
         "伝票摘要": "voucher_description",
@@ -30,7 +35,43 @@ class JournalEntry(BaseModel):
         "合計金額": "total_amount",
         "税区分": "tax_category",
         "明細摘要": "detail_description",
-    }
+    }.items()
+}
+
+
+def intern_csv_header(reader: csv.DictReader) -> csv.DictReader:
+    """
+    DictReaderのヘッダー（各行の辞書のキー）をinternする
+
+    全行の辞書で同じキーオブジェクトが共有されるため、
+    from_csv_row での CSV_FIELD_MAPPING の検索が文字列比較なしで一致する
+    """
+    if reader.fieldnames is not None:
+        reader.fieldnames = [sys.intern(name) for name in reader.fieldnames]
+    return reader
+
+
+class JournalEntry(BaseModel):
+    """
+    会計仕訳データモデル
+    実際のCSVファイルの18項目レイアウトに基づいて定義
+    """
+
+    # CSVカラム名から英語フィールド名へのマッピング
+    CSV_FIELD_MAPPING: ClassVar[Dict[str, str]] = JOURNAL_CSV_FIELD_MAPPING
+
+    # 空文字列をNoneとして扱うオプションフィールド
+    OPTIONAL_FIELDS: ClassVar[FrozenSet[str]] = frozenset(
+        {
+            "sub_account_code",
+            "sub_account_name",
+            "customer_code",
+            "customer_name",
+            "analysis_code",
+            "analysis_code_name",
+            "detail_description",
+        }
+    )
 
     # 1. 日付 - 必須項目
     date: datetime = Field(..., description="仕訳日付 (YYYY/MM/DD形式)")
@@ -73,14 +114,14 @@ class JournalEntry(BaseModel):
     # 13. 分析コード名 - オプション項目
     analysis_code_name: Optional[str] = Field(None, description="分析コード名")
 
-    # 14. 基準金額 - 必須項目（税抜金額）
-    base_amount: Decimal = Field(..., description="基準金額（税抜）", ge=0)
+    # 14. 基準金額 - 必須項目（税抜金額、円単位の整数）
+    base_amount: int = Field(..., description="基準金額（税抜）", ge=0)
 
-    # 15. 税額 - 必須項目
-    tax_amount: Decimal = Field(..., description="税額", ge=0)
+    # 15. 税額 - 必須項目（円単位の整数）
+    tax_amount: int = Field(..., description="税額", ge=0)
 
-    # 16. 合計金額 - 必須項目（税込金額）
-    total_amount: Decimal = Field(..., description="合計金額（税込）", ge=0)
+    # 16. 合計金額 - 必須項目（税込金額、円単位の整数）
+    total_amount: int = Field(..., description="合計金額（税込）", ge=0)
 
     # 17. 税区分 - 必須項目
     tax_category: str = Field(
@@ -90,11 +131,20 @@ class JournalEntry(BaseModel):
     # 18. 明細摘要 - オプション項目
     detail_description: Optional[str] = Field(None, description="明細摘要")
 
-    @validator("date", pre=True)
+    @field_validator("date", mode="before")
+    @classmethod
     def parse_date(cls, v):
         """日付文字列をdatetimeオブジェクトに変換"""
         if isinstance(v, str):
             try:
+                # 固定長のYYYY/MM/DDは書式解析を行わず数値を直接切り出す
+                if (
+                    len(v) == 10
+                    and v[4] == "/"
+                    and v[7] == "/"
+                    and v.replace("/", "").isdigit()
+                ):
+                    return datetime(int(v[:4]), int(v[5:7]), int(v[8:10]))
                 return datetime.strptime(v, "%Y/%m/%d")
             except ValueError:
                 raise ValueError(
@@ -102,85 +152,102 @@ class JournalEntry(BaseModel):
                 )
         return v
 
-    @validator("base_amount", "tax_amount", "total_amount", pre=True)
-    def parse_decimal(cls, v):
-        """数値文字列をDecimalに変換"""
+    @field_validator("base_amount", "tax_amount", "total_amount", mode="before")
+    @classmethod
+    def parse_amount(cls, v):
+        """数値文字列を円単位の整数に変換（円未満の金額は扱わない）"""
         if isinstance(v, str):
             # カンマを除去して数値に変換
-            v = v.replace(",", "")
-            return Decimal(v)
-        return Decimal(str(v))
-
-    @validator("total_amount")
-    def validate_total_amount(cls, v, values):
-        """合計金額が基準金額+税額と一致することを確認"""
-        if "base_amount" in values and "tax_amount" in values:
-            expected_total = values["base_amount"] + values["tax_amount"]
-            if abs(v - expected_total) > Decimal("0.01"):  # 1円の誤差まで許容
-                raise ValueError(
-                    f"合計金額が不正です。基準金額({values['base_amount']}) + 税額({values['tax_amount']}) = {expected_total} ≠ {v}"
-                )
+            s = v.replace(",", "").strip()
+            try:
+                return int(s)
+            except ValueError:
+                pass
+
+            # "1000.00"のように小数部がゼロの表記は整数として受け付ける
+            try:
+                d = Decimal(s)
+            except InvalidOperation:
+                raise ValueError(f"金額の形式が正しくありません: {v}")
+            if not d.is_finite() or d != d.to_integral_value():
+                raise ValueError(f"金額は円単位の整数で入力してください: {v}")
+            return int(d)
         return v
 
+    @model_validator(mode="after")
+    def validate_total_amount(self) -> "JournalEntry":
+        """合計金額が基準金額+税額と一致することを確認（全フィールドの検証後に1回だけ実行）"""
+        expected_total = self.base_amount + self.tax_amount
+        if self.total_amount != expected_total:
+            raise ValueError(
+                f"合計金額が不正です。基準金額({self.base_amount}) + 税額({self.tax_amount}) = {expected_total} ≠ {self.total_amount}"
+            )
+        return self
+
     @classmethod
     def from_csv_row(cls, csv_row: dict) -> "JournalEntry":
         """
         CSVの日本語カラム名から英語フィールド名に変換してインスタンスを作成
         """
         mapped_data = {}
-        for japanese_key, english_key in cls.CSV_FIELD_MAPPING.items():
-            if japanese_key in csv_row:
-                value = csv_row[japanese_key]
-                # 空文字列をNoneに変換（オプションフィールド用）
-                if value == "" and english_key in [
-                    "sub_account_code",
-                    "sub_account_name",
-                    "customer_code",
-                    "customer_name",
-                    "analysis_code",
-                    "analysis_code_name",
-                    "detail_description",
-                ]:
-                    mapped_data[english_key] = None
-                else:
-                    mapped_data[english_key] = value
-
-        return cls(**mapped_data)
+        get_english_key = JOURNAL_CSV_FIELD_MAPPING.get
+        for japanese_key, value in csv_row.items():
+            english_key = get_english_key(japanese_key)
+            if english_key is None:
+                continue
+            # 空文字列をNoneに変換（オプションフィールド用）
+            if value == "" and english_key in cls.OPTIONAL_FIELDS:
+                mapped_data[english_key] = None
+            else:
+                mapped_data[english_key] = value
+
+        # 辞書から直接検証（キーワード引数への展開を挟まない）
+        # ※ model_constructによる検証省略も計測したが、pydantic v2ではPython側で
+        #   フィールドを走査するため、こちらの検証付き生成より遅かった
+        return cls.model_validate(mapped_data)
 
     def to_text_for_embedding(self) -> str:
         """
         RAG検索用のテキスト形式に変換
         各フィールドを検索可能な自然言語形式で結合
         """
-        parts = [
-            f"日付: {self.date.strftime('%Y年%m月%d日')}",
-            f"仕訳番号: {self.journal_number}",
-            f"{"借方" if self.debit_credit == "D" else "貸方"}",
-            f"勘定科目: {self.account_name}({self.account_code})",
-        ]
-
-        if self.sub_account_name:
-            parts.append(f"補助科目: {self.sub_account_name}")
-
-        if self.customer_name:
-            parts.append(f"取引先: {self.customer_name}")
-
-        parts.extend(
-            [
-                f"金額: {self.total_amount:,}円",
-                f"基準金額: {self.base_amount:,}円",
-                f"税額: {self.tax_amount:,}円",
-                f"税区分: {self.tax_category}",
-            ]
+        date = self.date
+        side = "借方" if self.debit_credit == "D" else "貸方"
+        sub_account = (
+            f", 補助科目: {self.sub_account_name}" if self.sub_account_name else ""
+        )
+        customer = f", 取引先: {self.customer_name}" if self.customer_name else ""
+        voucher = (
+            f", 摘要: {self.voucher_description}" if self.voucher_description else ""
+        )
+        detail = f", 明細: {self.detail_description}" if self.detail_description else ""
+
+        # リストを組み立てずに1つのf-stringで連結する（日付もstrftimeを使わずに整形）
+        return (
+            f"日付: {date.year}年{date.month:02d}月{date.day:02d}日, "
+            f"仕訳番号: {self.journal_number}, "
+            f"{side}, "
+            f"勘定科目: {self.account_name}({self.account_code})"
+            f"{sub_account}{customer}, "
+            f"金額: {self.total_amount:,}円, "
+            f"基準金額: {self.base_amount:,}円, "
+            f"税額: {self.tax_amount:,}円, "
+            f"税区分: {self.tax_category}"
+            f"{voucher}{detail}"
         )
 
-        if self.voucher_description:
-            parts.append(f"摘要: {self.voucher_description}")
-
-        if self.detail_description:
-            parts.append(f"明細: {self.detail_description}")
+    @classmethod
+    def batch_for_pinecone(
+        cls, entries: List["JournalEntry"]
+    ) -> Tuple[List[str], List[dict]]:
+        """
+        複数の仕訳をエンベディング用テキストとメタデータのリストにまとめて変換
 
-        return ", ".join(parts)
+        返り値の2つのリストはentriesと同じ順序で対応する
+        """
+        texts = [entry.to_text_for_embedding() for entry in entries]
+        metadatas = [entry.to_metadata_dict() for entry in entries]
+        return texts, metadatas
 
     def to_metadata_dict(self) -> dict:
         """
@@ -196,17 +263,15 @@ class JournalEntry(BaseModel):
             "sub_account_name": self.sub_account_name or "",
             "customer_code": self.customer_code or "",
             "customer_name": self.customer_name or "",
-            "base_amount": float(self.base_amount),
-            "tax_amount": float(self.tax_amount),
-            "total_amount": float(self.total_amount),
+            "base_amount": self.base_amount,
+            "tax_amount": self.tax_amount,
+            "total_amount": self.total_amount,
             "tax_category": self.tax_category,
             "voucher_description": self.voucher_description,
             "detail_description": self.detail_description or "",
         }
 
-    class Config:
-        # JSON エンコーディング時の設定
-        json_encoders = {
-            datetime: lambda v: v.strftime("%Y/%m/%d"),
-            Decimal: lambda v: float(v),
-        }
+    # JSON エンコーディング時の設定
+    @field_serializer("date", when_used="json")
+    def serialize_date(self, v: datetime) -> str:
+        return v.strftime("%Y/%m/%d")
@@ -4,12 +4,31 @@
 
 from typing import Optional, List, Dict, Any
 import pandas as pd
-import openpyxl
+from openpyxl.utils import get_column_letter
 
 
 class TableCandidate:
     """検出された表の候補を表すクラス"""
 
+    # 表ごとに生成されるため、インスタンス辞書を持たずに属性を固定する
+    __slots__ = (
+        "table_id",
+        "sheet_name",
+        "start_row",
+        "end_row",
+        "start_col",
+        "end_col",
+        "header_row",
+        "quality_score",
+        "data_density",
+        "row_count",
+        "col_count",
+        "estimated_records",
+        "headers",
+        "sample_data",
+        "metadata",
+    )
+
     def __init__(
         self,
         table_id: str,
@@ -54,7 +73,7 @@ class TableCandidate:
                 "end_row": self.end_row,
                 "start_col": self.start_col,
                 "end_col": self.end_col,
-                "excel_range": f"{openpyxl.utils.get_column_letter(self.start_col)}{self.start_row}:{openpyxl.utils.get_column_letter(self.end_col)}{self.end_row}",
+                "excel_range": f"{get_column_letter(self.start_col)}{self.start_row}:{get_column_letter(self.end_col)}{self.end_row}",
             },
             "header_row": self.header_row,
             "quality_score": round(self.quality_score, 3),
@@ -73,8 +92,14 @@ class TableCandidate:
 class SessionData:
     """セッションデータを管理するクラス"""
 
+    __slots__ = (
+        "processed_data",
+        "analysis_result",
+        "metadata",
+        "file_info",
+    )
+
     def __init__(self):
-        self.raw_data: Optional[pd.DataFrame] = None
         self.processed_data: Optional[pd.DataFrame] = None
         self.analysis_result: Dict[str, Any] = {}
         self.metadata: Dict[str, Any] = {}
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Path
-from typing import Dict, Any, Optional, List
-import uuid
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Dict, Any, Iterator, Optional, List, Tuple
+import secrets
+import asyncio
 import logging
 import urllib.parse
+import orjson
 import pandas as pd
 from pydantic import BaseModel
 from datetime import datetime
@@ -15,14 +18,17 @@ from services.file_processor import FileProcessor
 from services.file_validator import FileValidator
 from services.data_analyzer import DataAnalyzer
 from services.schema_inference_service import SchemaInferenceService
+from utils.dataframe_utils import StoredFrame, unpack_dataframe
 from utils.excel_utils import extract_table_data
 
 # ログ設定
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 router = APIRouter(prefix="/api", tags=["Excel Parser"])
 
+# NDJSONでストリーミング返却する際の1チャンクあたりの行数
+STREAM_CHUNK_ROWS = 1000
+
 # グローバルインスタンス
 default_table_detector = StatisticalTableDetector()
 session_manager = SessionManager()
@@ -41,24 +47,30 @@ def get_schema_inference_service():
     return _schema_inference_service
 
 
+def new_session_id() -> str:
+    """セッションIDを生成（os.urandomの16バイトを16進文字列化）"""
+    return secrets.token_hex(16)
+
+
 @router.post("/parse-excel")
 async def parse_excel(file: UploadFile = File(...)):
     """Excel/CSVファイルを解析するエンドポイント"""
     try:
-        # ファイル内容を読み取り
-        file_content = await file.read()
-
-        # ファイルサイズを検証
-        file_validator.validate_file_size(file_content)
+        # ファイルサイズを検証（内容はメモリに読み込まず、一時ファイルのまま処理する）
+        file_validator.validate_upload_size(file)
+        file_content = file.file
 
         # ファイル形式を判定
         file_type = file_validator.detect_file_type(file)
 
         # セッションIDを生成
-        session_id = str(uuid.uuid4())
+        session_id = new_session_id()
 
         logger.info(
-            f"Processing file: {file.filename}, type: {file_type}, session: {session_id}"
+            "Processing file: %s, type: %s, session: %s",
+            file.filename,
+            file_type,
+            session_id,
         )
 
         # ファイル形式に応じて処理を分岐
@@ -87,13 +99,24 @@ async def parse_excel(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error processing file {file.filename}: {str(e)}")
+        logger.error("Unexpected error processing file %s: %s", file.filename, e)
         raise HTTPException(
             status_code=500,
             detail=f"ファイル処理中に予期しないエラーが発生しました: {str(e)}",
         )
 
 
+def dataframe_to_json_records(df: pd.DataFrame) -> str:
+    """DataFrameを欠損値を空文字にしたレコード形式のJSON文字列に変換"""
+    return df.fillna("").to_json(orient="records", date_format="iso", force_ascii=False)
+
+
+def stored_frame_to_json_records(stored: StoredFrame) -> Tuple[str, int]:
+    """セッションに保持したDataFrameを復元し、レコード形式のJSON文字列と行数を返す"""
+    df = unpack_dataframe(stored)
+    return dataframe_to_json_records(df), len(df)
+
+
 @router.get("/session/{session_id}/data")
 async def get_session_data_detail(session_id: str = Path(...)):
     """セッションの詳細データを取得"""
@@ -108,27 +131,68 @@ async def get_session_data_detail(session_id: str = Path(...)):
         processed_data = session.get("processed_data")
         if processed_data is not None:
             # 全データを返す（大きなファイルの場合は制限をかけることも可能）
-            data_dict = processed_data.fillna("").to_dict("records")
-            return {
-                "status": "success",
-                "session_id": session_id,
-                "file_info": session.get("file_info", {}),
-                "data": data_dict,
-                "total_rows": len(data_dict),
-            }
+            # 行データはpandasのC実装でJSON化し、再エンコードせずにレスポンスへ埋め込む
+            data_json, total_rows = await asyncio.to_thread(
+                stored_frame_to_json_records, processed_data
+            )
+            return ORJSONResponse(
+                {
+                    "status": "success",
+                    "session_id": session_id,
+                    "file_info": session.get("file_info", {}),
+                    "data": orjson.Fragment(data_json),
+                    "total_rows": total_rows,
+                }
+            )
         else:
             raise HTTPException(
                 status_code=404, detail="処理済みデータが見つかりません"
             )
 
     except Exception as e:
-        logger.error(f"Error retrieving session data {session_id}: {str(e)}")
+        logger.error("Error retrieving session data %s: %s", session_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"セッションデータの取得中にエラーが発生しました: {str(e)}",
         )
 
 
+def iter_ndjson_chunks(df: pd.DataFrame) -> Iterator[str]:
+    """DataFrameをSTREAM_CHUNK_ROWS行ずつ改行区切りJSON（NDJSON）に変換して返す"""
+    for start in range(0, len(df), STREAM_CHUNK_ROWS):
+        chunk = df.iloc[start : start + STREAM_CHUNK_ROWS]
+        yield chunk.fillna("").to_json(
+            orient="records", lines=True, date_format="iso", force_ascii=False
+        )
+
+
+@router.get("/session/{session_id}/data/stream")
+async def stream_session_data(session_id: str = Path(...)):
+    """
+    セッションの詳細データを1行1レコードのNDJSONでストリーミング返却
+
+    全行をまとめてJSON化しないため、大きなファイルでもメモリ使用量が行数に比例して増えない
+    """
+    session = session_manager.get_session_data(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=404, detail="セッションが見つからないか期限切れです"
+        )
+
+    processed_data = await asyncio.to_thread(
+        unpack_dataframe, session.get("processed_data")
+    )
+    if processed_data is None:
+        raise HTTPException(status_code=404, detail="処理済みデータが見つかりません")
+
+    # 同期ジェネレーターはStarletteがスレッドプールで反復するため、JSON化はイベントループを塞がない
+    return StreamingResponse(
+        iter_ndjson_chunks(processed_data),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Rows": str(len(processed_data))},
+    )
+
+
 @router.get("/session/{session_id}/analysis")
 async def get_session_analysis(session_id: str = Path(...)):
     """セッションの分析結果を取得"""
@@ -150,7 +214,7 @@ async def get_session_analysis(session_id: str = Path(...)):
         }
 
     except Exception as e:
-        logger.error(f"Error retrieving session analysis {session_id}: {str(e)}")
+        logger.error("Error retrieving session analysis %s: %s", session_id, e)
         raise HTTPException(
             status_code=500, detail=f"分析結果の取得中にエラーが発生しました: {str(e)}"
         )
@@ -161,7 +225,7 @@ async def delete_session(session_id: str = Path(...)):
     """セッションを削除"""
     session_manager.delete_session(session_id)
 
-    logger.info(f"Session deleted: {session_id}")
+    logger.info("Session deleted: %s", session_id)
     return {"status": "success", "message": f"セッション {session_id} が削除されました"}
 
 
@@ -176,23 +240,25 @@ async def parse_excel_sheets(file: UploadFile = File(...)):
                 detail="サポートされていないファイル形式です。Excel形式（.xlsx, .xls）のファイルをアップロードしてください。",
             )
 
-        # ファイル内容を読み取り
+        # ファイルサイズを検証してから読み込む（ワークブックはセッションに保持するためバイト列で取得）
+        file_validator.validate_upload_size(file)
         file_content = await file.read()
 
-        # ファイルサイズを検証
-        file_validator.validate_file_size(file_content)
-
         # セッションIDを生成
-        session_id = str(uuid.uuid4())
+        session_id = new_session_id()
 
         logger.info(
-            f"Processing Excel sheets for: {file.filename}, session: {session_id}"
+            "Processing Excel sheets for: %s, session: %s", file.filename, session_id
         )
 
-        # Excelシート情報を処理
+        # Excelシート情報を処理（ワークブックの解析はスレッドプールで実行）
         filename = file.filename or "unknown_file.xlsx"
-        result = file_processor.process_excel_sheets(
-            file_content, filename, session_id, session_manager
+        result = await asyncio.to_thread(
+            file_processor.process_excel_sheets,
+            file_content,
+            filename,
+            session_id,
+            session_manager,
         )
 
         return {
@@ -206,7 +272,7 @@ async def parse_excel_sheets(file: UploadFile = File(...)):
         raise
     except Exception as e:
         logger.error(
-            f"Unexpected error processing Excel file {file.filename}: {str(e)}"
+            "Unexpected error processing Excel file %s: %s", file.filename, e
         )
         raise HTTPException(
             status_code=500,
@@ -254,11 +320,12 @@ async def detect_tables_in_sheet(
         decoded_sheet_name = urllib.parse.unquote(sheet_name)
 
         logger.info(
-            f"Detecting tables in sheet '{decoded_sheet_name}' (session: {session_id})"
+            "Detecting tables in sheet '%s' (session: %s)", decoded_sheet_name, session_id
         )
 
-        # 表検出を実行
-        table_candidates = default_table_detector.detect_tables(
+        # 表検出を実行（CPU負荷が高いためスレッドプールで実行）
+        table_candidates = await asyncio.to_thread(
+            default_table_detector.detect_tables,
             workbook_data=workbook_data,
             sheet_name=decoded_sheet_name,
             min_rows=min_rows,
@@ -266,11 +333,15 @@ async def detect_tables_in_sheet(
             max_tables=max_tables,
         )
 
+        # 表データは1回だけ辞書化し、セッションとレスポンスで共有する
+        tables = [table.to_dict() for table in table_candidates]
+        detection_info = default_table_detector.get_detector_info()
+
         # 検出された表をセッションに保存
         session["detected_tables"] = {
             "sheet_name": decoded_sheet_name,
-            "tables": [table.to_dict() for table in table_candidates],
-            "detection_info": default_table_detector.get_detector_info(),
+            "tables": tables,
+            "detection_info": detection_info,
             "detection_time": session_manager.get_current_time().isoformat(),
         }
 
@@ -278,8 +349,8 @@ async def detect_tables_in_sheet(
         response_data = {
             "sheet_name": decoded_sheet_name,
             "total_tables": len(table_candidates),
-            "tables": [table.to_dict() for table in table_candidates],
-            "detection_info": default_table_detector.get_detector_info(),
+            "tables": tables,
+            "detection_info": detection_info,
         }
 
         return {
@@ -293,13 +364,30 @@ async def detect_tables_in_sheet(
         raise
     except Exception as e:
         logger.error(
-            f"Error detecting tables in sheet {sheet_name} (session: {session_id}): {str(e)}"
+            "Error detecting tables in sheet %s (session: %s): %s", sheet_name, session_id, e
         )
         raise HTTPException(
             status_code=500, detail=f"表検出中にエラーが発生しました: {str(e)}"
         )
 
 
+def extract_and_analyze_table(
+    workbook_data: bytes, sheet_name: str, table_info: Dict[str, Any]
+) -> Dict[str, Any]:
+    """表の全データを抽出し、データ型と品質の分析結果を付加する（ブロッキング）"""
+    full_table_data = extract_table_data(workbook_data, sheet_name, table_info)
+
+    if full_table_data["records"]:
+        df = pd.DataFrame(full_table_data["records"])
+        data_types = data_analyzer.analyze_data_types(df)
+        full_table_data["data_types"] = data_types
+        full_table_data["quality_info"] = data_analyzer.analyze_data_quality(
+            df, data_types
+        )
+
+    return full_table_data
+
+
 @router.post("/select-table/{session_id}/{table_id}")
 async def select_table(session_id: str = Path(...), table_id: str = Path(...)):
     """選択された表のデータを取得し、最終処理を行うエンドポイント"""
@@ -337,19 +425,14 @@ async def select_table(session_id: str = Path(...), table_id: str = Path(...)):
                 status_code=404, detail="Excelワークブックデータが見つかりません"
             )
 
-        # 表の全データを取得
-        full_table_data = extract_table_data(
-            workbook_data, detected_tables["sheet_name"], selected_table
+        # 表の全データを取得し、データ型分析と品質分析を実行（スレッドプールで実行）
+        full_table_data = await asyncio.to_thread(
+            extract_and_analyze_table,
+            workbook_data,
+            detected_tables["sheet_name"],
+            selected_table,
         )
 
-        # データ型分析と品質分析を実行
-        if full_table_data["records"]:
-            import pandas as pd
-
-            df = pd.DataFrame(full_table_data["records"])
-            full_table_data["data_types"] = data_analyzer.analyze_data_types(df)
-            full_table_data["quality_info"] = data_analyzer.analyze_data_quality(df)
-
         # セッションに最終データを保存
         session["selected_table"] = {
             "table_info": selected_table,
@@ -387,7 +470,7 @@ async def select_table(session_id: str = Path(...), table_id: str = Path(...)):
         raise
     except Exception as e:
         logger.error(
-            f"Error selecting table {table_id} (session: {session_id}): {str(e)}"
+            "Error selecting table %s (session: %s): %s", table_id, session_id, e
         )
         raise HTTPException(
             status_code=500, detail=f"表選択中にエラーが発生しました: {str(e)}"
@@ -433,12 +516,17 @@ async def infer_schema(request: SchemaInferenceRequest):
         for i, row in enumerate(request.sample_data):
             if len(row) != header_count:
                 logger.warning(
-                    f"サンプルデータ行{i+1}の列数({len(row)})がヘッダー列数({header_count})と一致しません"
+                    "サンプルデータ行%dの列数(%d)がヘッダー列数(%d)と一致しません",
+                    i + 1,
+                    len(row),
+                    header_count,
                 )
         
         logger.info(
-            f"スキーマ推論開始 - セッション: {request.session_id}, "
-            f"ヘッダー数: {len(request.headers)}, サンプル行数: {len(request.sample_data)}"
+            "スキーマ推論開始 - セッション: %s, ヘッダー数: %d, サンプル行数: %d",
+            request.session_id,
+            len(request.headers),
+            len(request.sample_data),
         )
         
         # スキーマ推論実行
@@ -463,9 +551,10 @@ async def infer_schema(request: SchemaInferenceRequest):
         session_manager.save_session_data(request.session_id, session_data)
         
         logger.info(
-            f"スキーマ推論完了 - セッション: {request.session_id}, "
-            f"信頼度: {inference_result.get('overall_confidence', 0)}, "
-            f"有効性: {is_valid}"
+            "スキーマ推論完了 - セッション: %s, 信頼度: %s, 有効性: %s",
+            request.session_id,
+            inference_result.get("overall_confidence", 0),
+            is_valid,
         )
         
         return {
@@ -483,8 +572,7 @@ async def infer_schema(request: SchemaInferenceRequest):
         raise
     except Exception as e:
         logger.error(
-            f"スキーマ推論エラー - セッション: {request.session_id}, "
-            f"エラー: {str(e)}"
+            "スキーマ推論エラー - セッション: %s, エラー: %s", request.session_id, e
         )
         raise HTTPException(
             status_code=500,
@@ -495,7 +583,7 @@ async def infer_schema(request: SchemaInferenceRequest):
 # 後方互換性のため、シンプルなCSV処理関数を残しておく
 async def process_csv(file_content: bytes, filename: str) -> Dict[str, Any]:
     """CSV ファイルを処理する（シンプル版）"""
-    session_id = str(uuid.uuid4())
+    session_id = new_session_id()
     result = await file_processor.process_csv_advanced(
         file_content, filename, session_id, session_manager
     )
@@ -3,19 +3,18 @@ from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 import os
 import csv
-import tempfile
+import asyncio
 from pathlib import Path
 from datetime import datetime
 import logging
 
 # 必要なモジュールのインポート
-from models.journal_entry import JournalEntry
+from models.journal_entry import JournalEntry, intern_csv_header
 from database import db_manager
 
 # 環境変数とクライアント設定
 from dotenv import load_dotenv
-from supabase import create_client
-from pinecone import Pinecone
+from clients import get_supabase, get_pinecone
 import google.generativeai as genai
 
 load_dotenv(Path(__file__).parent.parent.parent / ".env")
@@ -24,22 +23,20 @@ load_dotenv(Path(__file__).parent.parent.parent / ".env")
 router = APIRouter(prefix="/api", tags=["journal-data"])
 
 # 外部サービスクライアントの設定
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+# Supabase/Pineconeクライアントは clients.get_supabase / get_pinecone で初回利用時に生成
 GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-# クライアント初期化
-supabase = (
-    create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-    if SUPABASE_URL and SUPABASE_ANON_KEY
-    else None
-)
-pc = Pinecone(api_key=PINECONE_API_KEY) if PINECONE_API_KEY else None
-
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# エンベディング生成の設定
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_BATCH_SIZE = 100  # Gemini batchEmbedContentsの1リクエストあたりの上限
+EMBEDDING_CONCURRENCY = 4  # 同時に実行するバッチ数
+
+# Supabaseへの一括挿入の1リクエストあたりの件数
+SUPABASE_INSERT_BATCH_SIZE = 500
+
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -66,6 +63,35 @@ class JournalDataRegistrationResponse(BaseModel):
     existing_count: Optional[int] = None
 
 
+def parse_journal_csv(content: str) -> list[JournalEntry]:
+    """
+    仕訳CSVの内容をJournalEntryのリストに変換（ブロッキング）
+
+    全行のバリデーションを行うCPU処理のため、呼び出し側でスレッドプールに逃がす
+    """
+    # BOMを除去
+    if content.startswith("\ufeff"):
+        content = content[1:]
+
+    entries = []
+    csv_reader = intern_csv_header(csv.DictReader(content.splitlines()))
+
+    for row in csv_reader:
+        try:
+            entry = JournalEntry.from_csv_row(row)
+            entries.append(entry)
+        except Exception as e:
+            logger.warning(f"CSVデータのパースに失敗: {row}, エラー: {e}")
+            continue
+
+    return entries
+
+
+def load_journal_csv_file(csv_path: Path) -> list[JournalEntry]:
+    """仕訳CSVファイルを読み込んでJournalEntryのリストに変換（ブロッキング）"""
+    return parse_journal_csv(csv_path.read_text(encoding="utf-8"))
+
+
 async def load_sample_journal_data() -> list[JournalEntry]:
     """サンプル仕訳データをCSVから読み込み"""
     csv_path = Path(__file__).parent.parent / "data" / "sample_journal_entries.csv"
@@ -75,37 +101,21 @@ async def load_sample_journal_data() -> list[JournalEntry]:
             status_code=404, detail=f"サンプルCSVファイルが見つかりません: {csv_path}"
         )
 
-    entries = []
     try:
-        with open(csv_path, "r", encoding="utf-8") as f:
-            # BOMを除去
-            content = f.read()
-            if content.startswith("\ufeff"):
-                content = content[1:]
-
-            # CSVを再度読み込み
-            csv_reader = csv.DictReader(content.splitlines())
-
-            for row in csv_reader:
-                try:
-                    entry = JournalEntry.from_csv_row(row)
-                    entries.append(entry)
-                except Exception as e:
-                    logger.warning(f"CSVデータのパースに失敗: {row}, エラー: {e}")
-                    continue
+        # ファイル読み込みとパースはスレッドプールで実行
+        return await asyncio.to_thread(load_journal_csv_file, csv_path)
 
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"CSVファイルの読み込みに失敗: {str(e)}"
         )
 
-    return entries
-
 
 async def save_entries_to_supabase(
     entries: list[JournalEntry], fiscal_year: int, fiscal_month: int, overwrite: bool
 ) -> dict:
     """仕訳データをSupabaseに保存"""
+    supabase = get_supabase()
     if not supabase:
         # HTTPExceptionを投げる代わりに、エラー情報を返す
         logger.error("Supabaseクライアントが設定されていません")
@@ -122,11 +132,13 @@ async def save_entries_to_supabase(
     try:
         # 上書きモードの場合、既存データを削除
         if overwrite:
-            delete_response = (
+            # 同期クライアントの通信はスレッドプールで実行し、Pineconeへの保存と並行させる
+            delete_response = await asyncio.to_thread(
                 supabase.table("journal_entries")
                 .delete()
-                .match({"fiscal_year": fiscal_year, "fiscal_month": fiscal_month})
-                .execute()
+                .eq("fiscal_year", fiscal_year)
+                .eq("fiscal_month", fiscal_month)
+                .execute
             )
             logger.info(
                 f"既存データを削除しました: 年度={fiscal_year}, 月={fiscal_month}"
@@ -138,20 +150,14 @@ async def save_entries_to_supabase(
 
         for entry in entries:
             try:
-                # Supabase用のデータ形式に変換
-                # entry.dict()の代わりにjson_encodersを適用したJSON互換形式を使用
-                original_data_dict = entry.dict()
+                # Supabase用のデータ形式に変換（金額は整数のためそのままJSON化できる）
+                original_data_dict = entry.model_dump()
                 # datetimeをISO形式の文字列に変換
-                if "date" in original_data_dict:
-                    original_data_dict["date"] = entry.date.strftime("%Y-%m-%d")
-                # Decimalをfloatに変換
-                for field in ["base_amount", "tax_amount", "total_amount"]:
-                    if field in original_data_dict:
-                        original_data_dict[field] = float(original_data_dict[field])
+                original_data_dict["date"] = entry.date.strftime("%Y-%m-%d")
 
                 supabase_data = {
                     "entry_date": entry.date.strftime("%Y-%m-%d"),
-                    "amount": float(entry.total_amount),
+                    "amount": entry.total_amount,
                     "person": entry.customer_name or "",
                     "category": entry.account_name,
                     "description": entry.voucher_description,
@@ -165,8 +171,8 @@ async def save_entries_to_supabase(
                     "fiscal_month": fiscal_month,
                     "journal_number": entry.journal_number,
                     "debit_credit": entry.debit_credit,
-                    "base_amount": float(entry.base_amount),
-                    "tax_amount": float(entry.tax_amount),
+                    "base_amount": entry.base_amount,
+                    "tax_amount": entry.tax_amount,
                     "tax_category": entry.tax_category,
                 }
 
@@ -177,7 +183,7 @@ async def save_entries_to_supabase(
                 conversion_errors += 1
 
         # バッチ挿入の実行（適切なバッチサイズで分割）
-        batch_size = 100  # Supabaseの推奨バッチサイズ
+        batch_size = SUPABASE_INSERT_BATCH_SIZE
         total_batches = (len(supabase_data_list) + batch_size - 1) // batch_size
 
         logger.info(
@@ -189,8 +195,8 @@ async def save_entries_to_supabase(
             batch_num = (i // batch_size) + 1
 
             try:
-                insert_response = (
-                    supabase.table("journal_entries").insert(batch_data).execute()
+                insert_response = await asyncio.to_thread(
+                    supabase.table("journal_entries").insert(batch_data).execute
                 )
                 batch_success = len(batch_data)
                 success_count += batch_success
@@ -200,29 +206,24 @@ async def save_entries_to_supabase(
 
             except Exception as e:
                 logger.error(f"バッチ {batch_num}/{total_batches} の挿入に失敗: {e}")
-                # バッチ全体が失敗した場合、そのバッチの件数を失敗としてカウント
                 batch_failed = len(batch_data)
-                failed_count += batch_failed
 
-                # 個別挿入でリトライ（オプション：より詳細なエラー情報が必要な場合）
-                if batch_failed <= 10:  # 小さなバッチの場合のみリトライ
-                    logger.info(f"バッチ失敗のため個別挿入でリトライ: {batch_failed}件")
-                    individual_success = 0
-                    for single_data in batch_data:
-                        try:
-                            supabase.table("journal_entries").insert(
-                                single_data
-                            ).execute()
-                            individual_success += 1
-                        except Exception as individual_error:
-                            logger.error(
-                                f"個別挿入も失敗: {single_data.get('journal_number', 'unknown')}, エラー: {individual_error}"
-                            )
-
-                    # 成功・失敗数を調整
-                    failed_count -= batch_failed  # バッチ失敗分を戻す
-                    success_count += individual_success
-                    failed_count += batch_failed - individual_success
+                # 失敗したバッチだけ個別挿入でリトライし、行単位の成功・失敗数を数える
+                logger.info(f"バッチ失敗のため個別挿入でリトライ: {batch_failed}件")
+                individual_success = 0
+                for single_data in batch_data:
+                    try:
+                        await asyncio.to_thread(
+                            supabase.table("journal_entries").insert(single_data).execute
+                        )
+                        individual_success += 1
+                    except Exception as individual_error:
+                        logger.error(
+                            f"個別挿入も失敗: {single_data.get('journal_number', 'unknown')}, エラー: {individual_error}"
+                        )
+
+                success_count += individual_success
+                failed_count += batch_failed - individual_success
 
         # 変換エラーも失敗数に追加
         failed_count += conversion_errors
@@ -246,10 +247,42 @@ async def save_entries_to_supabase(
     }
 
 
+async def embed_texts_in_batches(
+    texts: list[str],
+) -> list[tuple[int, Optional[list[list[float]]]]]:
+    """
+    テキストをEMBEDDING_BATCH_SIZE件ずつGeminiでエンベディング化
+
+    各バッチは1回のAPI呼び出しで処理し、最大EMBEDDING_CONCURRENCYバッチを並列に実行する。
+    返り値は (バッチ先頭のインデックス, ベクトルのリスト) のリストで、
+    失敗したバッチのベクトルはNoneとなる
+    """
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+    async def embed_batch(batch_start: int):
+        batch_texts = texts[batch_start : batch_start + EMBEDDING_BATCH_SIZE]
+        async with semaphore:
+            try:
+                embedding_result = await asyncio.to_thread(
+                    genai.embed_content, model=EMBEDDING_MODEL, content=batch_texts
+                )
+                return batch_start, embedding_result["embedding"]
+            except Exception as e:
+                logger.error(
+                    f"エンベディング生成に失敗: {batch_start + 1}〜{batch_start + len(batch_texts)}件目, エラー: {e}"
+                )
+                return batch_start, None
+
+    return await asyncio.gather(
+        *(embed_batch(i) for i in range(0, len(texts), EMBEDDING_BATCH_SIZE))
+    )
+
+
 async def generate_embeddings_and_store_to_pinecone(
     entries: list[JournalEntry], fiscal_year: int, fiscal_month: int
 ) -> dict:
     """エンベディングを生成してPineconeに保存"""
+    pc = get_pinecone()
     if not pc:
         logger.error("Pineconeクライアントが設定されていません")
         return {
@@ -290,31 +323,32 @@ async def generate_embeddings_and_store_to_pinecone(
         # インデックスに接続
         index = pc.Index(index_name)
 
-        # 全データのエンベディングを事前に生成
+        # 全データのエンベディングを事前に生成（テキストはまとめて変換し、APIはバッチ単位で呼び出す）
         vectors_to_upsert = []
         embedding_errors = 0
 
         logger.info(f"エンベディング生成開始: {len(entries)}件のデータを処理")
 
-        for entry in entries:
-            try:
-                # テキスト形式に変換
-                text_for_embedding = entry.to_text_for_embedding()
+        texts, metadatas = JournalEntry.batch_for_pinecone(entries)
+        embedding_batches = await embed_texts_in_batches(texts)
 
-                # Geminiでエンベディング生成
-                embedding_result = genai.embed_content(
-                    model="models/text-embedding-004", content=text_for_embedding
-                )
+        for batch_start, embedding_vectors in embedding_batches:
+            batch_entries = entries[batch_start : batch_start + EMBEDDING_BATCH_SIZE]
 
-                embedding_vector = embedding_result["embedding"]
+            if embedding_vectors is None:
+                embedding_errors += len(batch_entries)
+                continue
 
+            for offset, (entry, embedding_vector) in enumerate(
+                zip(batch_entries, embedding_vectors)
+            ):
                 # メタデータを準備
-                metadata = entry.to_metadata_dict()
+                metadata = metadatas[batch_start + offset]
                 metadata.update(
                     {
                         "fiscal_year": fiscal_year,
                         "fiscal_month": fiscal_month,
-                        "text_content": text_for_embedding,
+                        "text_content": texts[batch_start + offset],
                     }
                 )
 
@@ -324,12 +358,6 @@ async def generate_embeddings_and_store_to_pinecone(
                 # バッチ用のタプルを追加
                 vectors_to_upsert.append((vector_id, embedding_vector, metadata))
 
-            except Exception as e:
-                logger.error(
-                    f"エンベディング生成に失敗: {entry.journal_number}, エラー: {e}"
-                )
-                embedding_errors += 1
-
         # バッチアップサートの実行（適切なバッチサイズで分割）
         batch_size = 100  # Pineconeの推奨バッチサイズ
         total_batches = (len(vectors_to_upsert) + batch_size - 1) // batch_size
@@ -345,8 +373,8 @@ async def generate_embeddings_and_store_to_pinecone(
             batch_num = (i // batch_size) + 1
 
             try:
-                # バッチでアップサート
-                index.upsert(batch_vectors)
+                # バッチでアップサート（スレッドプールで実行し、Supabaseへの保存と並行させる）
+                await asyncio.to_thread(index.upsert, batch_vectors)
                 batch_success = len(batch_vectors)
                 success_count += batch_success
                 logger.info(
@@ -369,7 +397,7 @@ async def generate_embeddings_and_store_to_pinecone(
                     individual_success = 0
                     for single_vector in batch_vectors:
                         try:
-                            index.upsert([single_vector])
+                            await asyncio.to_thread(index.upsert, [single_vector])
                             individual_success += 1
                         except Exception as individual_error:
                             logger.error(
@@ -462,6 +490,7 @@ async def register_journal_data(
     指定された年月の会計データをSupabaseに保存し、
     Gemini 2.5 Flashでエンベディングを生成してPineconeに投入します。
     """
+    supabase = get_supabase()
     logger.info(
         f"会計仕訳データ登録開始: 年度={fiscal_year}, 月={fiscal_month}, 上書き={overwrite}"
     )
@@ -470,12 +499,12 @@ async def register_journal_data(
         # Step 0: 既存データの確認
         if not overwrite and supabase:
             # count='exact' の代わりに count="exact" を文字列として使用
-            existing_check = (
+            existing_check = await asyncio.to_thread(
                 supabase.table("journal_entries")
                 .select("*")
                 .eq("fiscal_year", fiscal_year)
                 .eq("fiscal_month", fiscal_month)
-                .execute()
+                .execute
             )
 
             existing_count = len(existing_check.data) if existing_check.data else 0
@@ -517,35 +546,10 @@ async def register_journal_data(
             # ファイル内容を読み込み
             content = await file.read()
 
-            # 一時ファイルに保存して処理
-            with tempfile.NamedTemporaryFile(
-                mode="wb", delete=False, suffix=".csv"
-            ) as temp_file:
-                temp_file.write(content)
-                temp_path = temp_file.name
-
-            try:
-                # CSVファイルとして読み込み
-                with open(temp_path, "r", encoding="utf-8") as f:
-                    csv_content = f.read()
-                    if csv_content.startswith("\ufeff"):
-                        csv_content = csv_content[1:]  # BOM除去
-
-                    csv_reader = csv.DictReader(csv_content.splitlines())
-
-                    for row in csv_reader:
-                        try:
-                            entry = JournalEntry.from_csv_row(row)
-                            entries.append(entry)
-                        except Exception as e:
-                            logger.warning(
-                                f"CSVデータのパースに失敗: {row}, エラー: {e}"
-                            )
-                            continue
-
-            finally:
-                # 一時ファイルを削除
-                os.unlink(temp_path)
+            # 一時ファイルを経由せずにデコードし、行ごとのバリデーションはスレッドプールで実行
+            entries.extend(
+                await asyncio.to_thread(parse_journal_csv, content.decode("utf-8"))
+            )
 
         logger.info(f"読み込み完了: {len(entries)}件の仕訳データ")
 
@@ -554,10 +558,13 @@ async def register_journal_data(
                 status_code=400, detail="処理対象の仕訳データがありません"
             )
 
-        # Step 2: Supabaseに保存
-        logger.info("Supabaseへのデータ保存を開始...")
-        supabase_result = await save_entries_to_supabase(
-            entries, fiscal_year, fiscal_month, overwrite
+        # Step 2, 3: Supabaseへの保存とPineconeへのエンベディング保存は互いに依存しないため並行して実行
+        logger.info("Supabaseへのデータ保存とPineconeへのエンベディング保存を開始...")
+        supabase_result, pinecone_result = await asyncio.gather(
+            save_entries_to_supabase(entries, fiscal_year, fiscal_month, overwrite),
+            generate_embeddings_and_store_to_pinecone(
+                entries, fiscal_year, fiscal_month
+            ),
         )
         logger.info(
             f"Supabase保存完了: 成功={supabase_result['success_count']}, 失敗={supabase_result['failed_count']}"
@@ -567,11 +574,6 @@ async def register_journal_data(
         if "error" in supabase_result:
             logger.warning(f"Supabase保存時にエラー: {supabase_result['error']}")
 
-        # Step 3: Pineconeにエンベディングを保存
-        logger.info("Pineconeへのエンベディング保存を開始...")
-        pinecone_result = await generate_embeddings_and_store_to_pinecone(
-            entries, fiscal_year, fiscal_month
-        )
         logger.info(
             f"Pinecone保存完了: 成功={pinecone_result['success_count']}, 失敗={pinecone_result['failed_count']}"
         )
@@ -629,6 +631,8 @@ async def get_journal_data_status():
     """
     会計仕訳データの登録状況を確認する
     """
+    supabase = get_supabase()
+    pc = get_pinecone()
     try:
         status_info: Dict[str, Any] = {
             "supabase_connected": supabase is not None,
@@ -658,7 +662,9 @@ async def get_journal_data_status():
         if supabase:
             try:
                 # journal_entriesテーブルの件数を取得
-                response = supabase.table("journal_entries").select("*").execute()
+                response = await asyncio.to_thread(
+                    supabase.table("journal_entries").select("*").execute
+                )
                 status_info["supabase_journal_count"] = (
                     len(response.data) if response.data else 0
                 )
@@ -683,6 +689,7 @@ async def get_journal_data(
     """
     登録済み仕訳データの一覧を取得
     """
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(
             status_code=500, detail="Supabaseクライアントが設定されていません"
@@ -712,10 +719,12 @@ async def get_journal_data(
         query = query.range(offset, offset + limit - 1).order("entry_date", desc=True)
 
         # データを取得
-        response = query.execute()
+        response = await asyncio.to_thread(query.execute)
 
         # 総件数を取得
-        count_response = supabase.table("journal_entries").select("*").execute()
+        count_response = await asyncio.to_thread(
+            supabase.table("journal_entries").select("*").execute
+        )
 
         return {
             "status": "success",
@@ -738,6 +747,7 @@ async def delete_journal_entry(entry_id: str):
     """
     指定された仕訳データを削除
     """
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(
             status_code=500, detail="Supabaseクライアントが設定されていません"
@@ -745,8 +755,8 @@ async def delete_journal_entry(entry_id: str):
 
     try:
         # データの存在確認
-        check_response = (
-            supabase.table("journal_entries").select("*").eq("id", entry_id).execute()
+        check_response = await asyncio.to_thread(
+            supabase.table("journal_entries").select("*").eq("id", entry_id).execute
         )
 
         if not check_response.data:
@@ -755,8 +765,8 @@ async def delete_journal_entry(entry_id: str):
             )
 
         # データを削除
-        delete_response = (
-            supabase.table("journal_entries").delete().eq("id", entry_id).execute()
+        delete_response = await asyncio.to_thread(
+            supabase.table("journal_entries").delete().eq("id", entry_id).execute
         )
 
         # TODO: Pineconeからも対応するベクトルを削除
@@ -778,6 +788,7 @@ async def get_journal_data_history(limit: int = 50, offset: int = 0):
     """
     仕訳データの操作履歴を取得
     """
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(
             status_code=500, detail="Supabaseクライアントが設定されていません"
@@ -800,17 +811,17 @@ async def get_journal_data_history(limit: int = 50, offset: int = 0):
         # ページネーション
         query = query.range(offset, offset + limit - 1)
 
-        response = query.execute()
+        response = await asyncio.to_thread(query.execute)
 
         # 総数を取得
-        count_response = (
+        count_response = await asyncio.to_thread(
             supabase.table("audit_logs")
             .select("*")
             .in_(
                 "action_type",
                 ["JOURNAL_DATA_UPLOAD", "JOURNAL_DATA_DELETE", "JOURNAL_DATA_UPDATE"],
             )
-            .execute()
+            .execute
         )
 
         # レスポンス形式を整理
@@ -852,7 +863,7 @@ async def get_journal_data_history(limit: int = 50, offset: int = 0):
             )
 
             # 重複を除去して登録操作の履歴を構築
-            response = query.execute()
+            response = await asyncio.to_thread(query.execute)
 
             # 期間ごとに集約
             history_by_period = {}
@@ -943,6 +954,7 @@ async def get_journal_data_stats():
     """
     仕訳データの統計情報を取得
     """
+    supabase = get_supabase()
     if not supabase:
         raise HTTPException(
             status_code=500, detail="Supabaseクライアントが設定されていません"
@@ -950,40 +962,42 @@ async def get_journal_data_stats():
 
     try:
         # 基本統計を取得
-        total_response = supabase.table("journal_entries").select("*").execute()
+        total_response = await asyncio.to_thread(
+            supabase.table("journal_entries").select("*").execute
+        )
         total_count = len(total_response.data) if total_response.data else 0
 
         # 月別集計を取得
-        monthly_response = (
+        monthly_response = await asyncio.to_thread(
             supabase.table("journal_entries")
             .select("fiscal_year, fiscal_month, amount")
-            .execute()
+            .execute
         )
 
         # 科目別集計を取得
-        category_response = (
-            supabase.table("journal_entries").select("category, amount").execute()
+        category_response = await asyncio.to_thread(
+            supabase.table("journal_entries").select("category, amount").execute
         )
 
         # 担当者別集計を取得
-        person_response = (
-            supabase.table("journal_entries").select("person, amount").execute()
+        person_response = await asyncio.to_thread(
+            supabase.table("journal_entries").select("person, amount").execute
         )
 
         # 最新・最古の仕訳データを取得
-        latest_response = (
+        latest_response = await asyncio.to_thread(
             supabase.table("journal_entries")
             .select("entry_date")
             .order("entry_date", desc=True)
             .limit(1)
-            .execute()
+            .execute
         )
-        earliest_response = (
+        earliest_response = await asyncio.to_thread(
             supabase.table("journal_entries")
             .select("entry_date")
             .order("entry_date", desc=False)
             .limit(1)
-            .execute()
+            .execute
         )
 
         # 統計情報を計算
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from typing import List, Optional, cast, Any
-from sqlalchemy import create_engine, text
-from supabase import create_client, Client
+from sqlalchemy import text
+from supabase import Client
 from dotenv import load_dotenv
+from database import db_manager, get_engine
+from clients import get_supabase
 import os
+import re
 import uuid
 from datetime import datetime
 import asyncio
@@ -23,28 +26,6 @@ router = APIRouter(prefix="/upload", tags=["File Upload"])
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# 環境変数からSupabase設定を取得
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-# Supabaseクライアントの型定義を修正
-supabase: Optional[Client] = None
-if SUPABASE_URL and SUPABASE_ANON_KEY:
-    supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-
-if DATABASE_URL:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30,
-        pool_recycle=3600,
-        echo=False  # デバッグ時はTrueに変更可能
-    )
-else:
-    engine = None
-
 # 許可されるファイルタイプ
 ALLOWED_EXTENSIONS = {'.xlsx', '.xls', '.csv'}
 ALLOWED_MIME_TYPES = {
@@ -54,21 +35,21 @@ ALLOWED_MIME_TYPES = {
     'application/csv'  # .csv
 }
 
+# Supabase Storageで許可されていない文字（英数字・アンダースコア・ハイフン以外）と連続するアンダースコア
+UNSAFE_FILENAME_CHARS = re.compile(r'[^a-zA-Z0-9\-_]')
+REPEATED_UNDERSCORES = re.compile(r'_+')
+
 def sanitize_filename(filename: str) -> str:
     """ファイル名をSupabase Storage対応形式に変換（日本語文字対応）"""
-    import re
-    import os
-    from datetime import datetime
-    
     # ファイル名と拡張子を分離
     name, ext = os.path.splitext(filename)
     
     # 日本語文字やSupabaseで許可されていない文字を削除/置換
     # 許可される文字: 英数字（a-z, A-Z, 0-9）、アンダースコア、ハイフンのみ
-    sanitized_name = re.sub(r'[^a-zA-Z0-9\-_]', '_', name)
+    sanitized_name = UNSAFE_FILENAME_CHARS.sub('_', name)
     
     # 連続するアンダースコアを単一に
-    sanitized_name = re.sub(r'_+', '_', sanitized_name)
+    sanitized_name = REPEATED_UNDERSCORES.sub('_', sanitized_name)
     
     # 先頭末尾のアンダースコアを削除
     sanitized_name = sanitized_name.strip('_')
@@ -103,7 +84,8 @@ async def create_business_request_with_files(
     files: List[UploadFile] = File(...)
 ):
     """業務依頼とファイルアップロードを一括処理"""
-    if not supabase or not engine:
+    supabase = get_supabase()
+    if not supabase or not get_engine():
         raise HTTPException(status_code=500, detail="Database or Supabase not configured")
     
     # ファイル数制限チェック（最大5ファイル）
@@ -119,8 +101,8 @@ async def create_business_request_with_files(
                 detail=f"サポートされていないファイル形式です: {file.filename}"
             )
         
-        # ファイル内容を一度だけ読み取り
-        file_content = await file.read()
+        # ファイル内容を一度だけ読み取り（上限を1バイト超えた時点で読み込みを止めて判定する）
+        file_content = await file.read(MAX_FILE_SIZE + 1)
         if len(file_content) > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
@@ -142,12 +124,15 @@ async def create_business_request_with_files(
         # 型チェックを無視してSupabaseクライアントを使用
         supabase_client = cast(Client, supabase)
         
-        business_request_response = supabase_client.table('business_requests').insert({
-            "id": business_request_id,
-            "title": title,
-            "description": description,
-            "status": "pending"
-        }).execute()
+        # 同期クライアントの通信はスレッドプールで実行し、イベントループを止めない
+        business_request_response = await asyncio.to_thread(
+            supabase_client.table('business_requests').insert({
+                "id": business_request_id,
+                "title": title,
+                "description": description,
+                "status": "pending"
+            }).execute
+        )
         
         if not business_request_response.data:
             raise HTTPException(status_code=500, detail="Failed to create business request")
@@ -264,10 +249,10 @@ async def create_business_request_with_files(
                     "storage_path": result["storage_path"]
                 })
         
-        # 一括データベース挿入（Supabaseクライアント使用）
+        # 一括データベース挿入（件数が多い場合はCOPY、それ以外は複数行INSERT）
         if file_records:
-            files_response = supabase_client.table('uploaded_files').insert(file_records).execute()
-            if not files_response.data:
+            files_result = await db_manager.copy_uploaded_files(file_records)
+            if files_result["status"] != "success" or not files_result["data"]:
                 raise HTTPException(status_code=500, detail="Failed to save file metadata")
         
         return {
@@ -287,7 +272,10 @@ async def create_business_request_with_files(
             if uploaded_storage_paths and supabase:
                 logger.info(f"Cleaning up {len(uploaded_storage_paths)} files from Storage")
                 supabase_client = cast(Client, supabase)
-                remove_response = supabase_client.storage.from_("uploaded-files").remove(uploaded_storage_paths)
+                remove_response = await asyncio.to_thread(
+                    supabase_client.storage.from_("uploaded-files").remove,
+                    uploaded_storage_paths
+                )
                 logger.info(f"Storage cleanup response: {remove_response}")
         except Exception as cleanup_e:
             cleanup_errors.append(f"Storage cleanup error: {str(cleanup_e)}")
@@ -297,9 +285,13 @@ async def create_business_request_with_files(
             if supabase:
                 supabase_client = cast(Client, supabase)
                 # 関連ファイル記録を削除
-                supabase_client.table('uploaded_files').delete().eq('business_request_id', business_request_id).execute()
+                await asyncio.to_thread(
+                    supabase_client.table('uploaded_files').delete().eq('business_request_id', business_request_id).execute
+                )
                 # 業務依頼を削除
-                supabase_client.table('business_requests').delete().eq('id', business_request_id).execute()
+                await asyncio.to_thread(
+                    supabase_client.table('business_requests').delete().eq('id', business_request_id).execute
+                )
         except Exception as cleanup_e:
             cleanup_errors.append(f"Database cleanup error: {str(cleanup_e)}")
         
@@ -312,29 +304,30 @@ async def create_business_request_with_files(
 @router.get("/business-request/{business_request_id}")
 async def get_business_request_files(business_request_id: str):
     """業務依頼に関連するファイル一覧を取得"""
+    engine = get_engine()
     if not engine:
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
-        with engine.connect() as connection:
+        async with engine.connect() as connection:
             # 業務依頼情報を取得
-            business_request = connection.execute(
+            business_request = (await connection.execute(
                 text("SELECT * FROM business_requests WHERE id = :id"),
                 {"id": business_request_id}
-            ).fetchone()
+            )).fetchone()
             
             if not business_request:
                 raise HTTPException(status_code=404, detail="業務依頼が見つかりません")
             
             # 関連ファイル一覧を取得
-            files = connection.execute(
+            files = (await connection.execute(
                 text("""
                 SELECT * FROM uploaded_files 
                 WHERE business_request_id = :business_request_id 
                 ORDER BY created_at
                 """),
                 {"business_request_id": business_request_id}
-            ).fetchall()
+            )).fetchall()
             
             return {
                 "business_request": {
@@ -371,22 +364,23 @@ async def get_business_request_files(business_request_id: str):
 @router.get("/upload-progress/{business_request_id}")
 async def get_upload_progress(business_request_id: str):
     """アップロード進行状況を取得"""
+    engine = get_engine()
     if not engine:
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
-        with engine.connect() as connection:
+        async with engine.connect() as connection:
             # 業務依頼の状態を確認
-            business_request = connection.execute(
+            business_request = (await connection.execute(
                 text("SELECT status, created_at FROM business_requests WHERE id = :id"),
                 {"id": business_request_id}
-            ).fetchone()
+            )).fetchone()
             
             if not business_request:
                 raise HTTPException(status_code=404, detail="業務依頼が見つかりません")
             
             # アップロード済みファイル数を取得
-            file_count = connection.execute(
+            file_count = (await connection.execute(
                 text("""
                 SELECT COUNT(*) as total_files,
                        COUNT(CASE WHEN upload_status = 'uploaded' THEN 1 END) as uploaded_files,
@@ -395,7 +389,7 @@ async def get_upload_progress(business_request_id: str):
                 WHERE business_request_id = :business_request_id
                 """),
                 {"business_request_id": business_request_id}
-            ).fetchone()
+            )).fetchone()
             
             # 進行率を計算
             total_files = getattr(file_count, 'total_files', 0) or 0
@@ -426,12 +420,13 @@ async def get_upload_progress(business_request_id: str):
 @router.get("/business-requests")
 async def list_business_requests():
     """業務依頼一覧を取得"""
+    engine = get_engine()
     if not engine:
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
-        with engine.connect() as connection:
-            requests = connection.execute(
+        async with engine.connect() as connection:
+            requests = (await connection.execute(
                 text("""
                 SELECT br.*, COUNT(uf.id) as file_count
                 FROM business_requests br
@@ -439,7 +434,7 @@ async def list_business_requests():
                 GROUP BY br.id, br.title, br.description, br.status, br.created_at, br.updated_at
                 ORDER BY br.created_at DESC
                 """)
-            ).fetchall()
+            )).fetchall()
             
             return {
                 "business_requests": [
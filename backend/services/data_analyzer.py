@@ -4,11 +4,110 @@
 
 import re
 import logging
-from typing import Dict, Any
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 
 logger = logging.getLogger(__name__)
 
+# ヘッダー行の判定に使う先頭行数（CSV読み込み時もこの行数だけ先読みする）
+HEADER_SCAN_ROWS = 10
+
+# ヘッダー行の判定に使う先頭列数（列数の多いファイルでも先頭の列だけで判定する）
+HEADER_SCAN_COLS = 50
+
+# Boolean型とみなす値（小文字化した文字列で比較）
+BOOLEAN_VALUES = frozenset({"true", "false", "yes", "no", "y", "n", "1", "0"})
+
+# 日付型とみなす値の先頭パターン
+DATE_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}"  # YYYY-MM-DD
+    r"|\d{4}/\d{2}/\d{2}"  # YYYY/MM/DD
+    r"|\d{2}/\d{2}/\d{4}"  # MM/DD/YYYY
+    r"|\d{2}-\d{2}-\d{4}"  # MM-DD-YYYY
+)
+
+
+# float()が受け付ける数値表記（前後の空白を除いた文字列の全体に一致させる）。
+# \dは全角数字などのUnicodeの10進数字にも一致し、float()と同じく桁の間のアンダースコアも許す
+_DIGITS = r"\d(?:_?\d)*"
+NUMERIC_TEXT_PATTERN = re.compile(
+    rf"[+-]?(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})(?:[eE][+-]?{_DIGITS})?"
+    r"|[+-]?(?:[nN][aA][nN]|[iI][nN][fF](?:[iI][nN][iI][tT][yY])?)"
+)
+
+
+def is_numeric_text(value: Any) -> bool:
+    """
+    値がfloatに変換できる数値表記か判定する（カンマ区切りも数値として扱う）
+
+    数値でない値の多い列やヘッダー行でも例外を発生させずに判定できるよう、float()の代わりに正規表現で判定する
+    """
+    return NUMERIC_TEXT_PATTERN.fullmatch(str(value).replace(",", "").strip()) is not None
+
+
+def count_value_kinds(col_data: pd.Series) -> Tuple[int, int, int, int]:
+    """
+    欠損値を除いた列のBoolean・数値・日付・整数とみなせる値の件数を数える
+
+    判定は値の文字列表現（str(value).strip()）で行う。
+    数値・真偽値・日時のdtypeは文字列化せず配列演算で数え、
+    それ以外は重複を除いた値ごとに1回だけ判定して件数で重み付けする
+    """
+    kind = col_data.dtype.kind
+    total_values = len(col_data)
+
+    if kind == "b":
+        # True/False はすべてBoolean型
+        return total_values, 0, 0, 0
+
+    if kind in "iu":
+        # 0と1はBoolean型として数え、それ以外は数値型。整数の判定にはすべて含める
+        boolean_count = int(col_data.isin([0, 1]).sum())
+        return boolean_count, total_values - boolean_count, 0, total_values
+
+    if kind == "f":
+        values = col_data.to_numpy(dtype=float)
+        integer_count = int((np.isfinite(values) & (values == np.floor(values))).sum())
+        return 0, total_values, 0, integer_count
+
+    if kind == "M":
+        # 日時は "YYYY-MM-DD ..." 形式の文字列になるため、すべて日付型
+        return 0, 0, total_values, 0
+
+    value_counts = col_data.astype(str).value_counts(sort=False)
+
+    numeric_count = 0
+    date_count = 0
+    boolean_count = 0
+    integer_count = 0
+
+    for value, count in value_counts.items():
+        str_value = value.strip()
+
+        is_numeric = is_numeric_text(str_value)
+
+        # 整数かどうか（Boolean型と判定される値も含めて数える）
+        if is_numeric and float(str_value.replace(",", "")).is_integer():
+            integer_count += count
+
+        # Boolean型チェック
+        if str_value.lower() in BOOLEAN_VALUES:
+            boolean_count += count
+            continue
+
+        # 数値型チェック（カンマ区切りの数値も考慮）
+        if is_numeric:
+            numeric_count += count
+            continue
+
+        # 日付型チェック
+        if DATE_PATTERN.match(str_value):
+            date_count += count
+
+    return boolean_count, numeric_count, date_count, integer_count
+
 
 class DataAnalyzer:
     """データ分析機能を提供するクラス"""
@@ -17,58 +116,39 @@ class DataAnalyzer:
     def detect_header_row(df: pd.DataFrame) -> int:
         """CSVファイルのヘッダー行を検出する"""
         try:
-            # 最初の10行を分析（ファイルが小さい場合は全行）
-            max_rows_to_check = min(10, len(df))
-
-            header_candidates = []
-
-            for i in range(max_rows_to_check):
-                row = df.iloc[i]
-
-                # 空行をスキップ
-                if row.isna().all() or (row == "").all():
-                    continue
+            # 最初の10行・50列を分析（ファイルが小さい場合は全行・全列）
+            values = df.iloc[:HEADER_SCAN_ROWS, :HEADER_SCAN_COLS].to_numpy(dtype=object)
+            if values.size == 0:
+                return 0
 
-                # 文字列データの割合を計算
-                string_count = 0
-                numeric_count = 0
+            # 欠損値と空文字は判定対象外（行ごとにSeriesを作らず、配列全体をまとめて判定する）
+            values = np.where(pd.isna(values), "", values)
+            present = values != ""
+            total_values = present.sum(axis=1)
 
-                for value in row:
-                    if pd.isna(value) or value == "":
-                        continue
-
-                    # 数値かどうかをチェック
-                    try:
-                        float(str(value).replace(",", ""))
-                        numeric_count += 1
-                    except (ValueError, TypeError):
-                        string_count += 1
+            # ヘッダー候補が見つからない場合は0行目を返す
+            best_row = 0
+            best_ratio = 0.0
 
-                total_values = string_count + numeric_count
-                if total_values == 0:
+            for i, row_values in enumerate(values):
+                # 少なくとも2つ以上の値がない行はヘッダー候補にならない
+                if total_values[i] < 2:
                     continue
 
-                string_ratio = string_count / total_values
-
-                # ヘッダー行の候補として評価
-                # - 文字列の割合が高い（70%以上）
-                # - 少なくとも2つ以上の値がある
-                if string_ratio >= 0.7 and total_values >= 2:
-                    header_candidates.append(
-                        {
-                            "row_index": i,
-                            "string_ratio": string_ratio,
-                            "total_values": total_values,
-                        }
-                    )
-
-            # 最も文字列の割合が高い行をヘッダーとして選択
-            if header_candidates:
-                best_candidate = max(header_candidates, key=lambda x: x["string_ratio"])
-                return best_candidate["row_index"]
+                # 文字列データの割合を計算（数値かどうかは値のある列だけをチェック）
+                numeric_count = sum(map(is_numeric_text, row_values[present[i]]))
+                string_ratio = (total_values[i] - numeric_count) / total_values[i]
+
+                # 文字列の割合が高い（70%以上）行のうち、最も割合が高い行をヘッダーとして選択
+                # （同率の場合は先頭の行）
+                if string_ratio >= 0.7 and string_ratio > best_ratio:
+                    best_row = i
+                    best_ratio = string_ratio
+                    # すべて文字列の行より割合の高い行はないため、以降の行は見ない
+                    if string_ratio == 1.0:
+                        break
 
-            # ヘッダー候補が見つからない場合は0行目を返す
-            return 0
+            return best_row
 
         except Exception as e:
             logger.warning(f"Header detection failed: {e}, using row 0 as default")
@@ -86,48 +166,9 @@ class DataAnalyzer:
                 data_types[col] = "empty"
                 continue
 
-            # 数値型の判定
-            numeric_count = 0
-            date_count = 0
-            boolean_count = 0
-
-            for value in col_data:
-                str_value = str(value).strip()
-
-                # Boolean型チェック
-                if str_value.lower() in [
-                    "true",
-                    "false",
-                    "yes",
-                    "no",
-                    "y",
-                    "n",
-                    "1",
-                    "0",
-                ]:
-                    boolean_count += 1
-                    continue
-
-                # 数値型チェック（カンマ区切りの数値も考慮）
-                try:
-                    float(str_value.replace(",", ""))
-                    numeric_count += 1
-                    continue
-                except (ValueError, TypeError):
-                    pass
-
-                # 日付型チェック
-                date_patterns = [
-                    r"\d{4}-\d{2}-\d{2}",  # YYYY-MM-DD
-                    r"\d{4}/\d{2}/\d{2}",  # YYYY/MM/DD
-                    r"\d{2}/\d{2}/\d{4}",  # MM/DD/YYYY
-                    r"\d{2}-\d{2}-\d{4}",  # MM-DD-YYYY
-                ]
-
-                for pattern in date_patterns:
-                    if re.match(pattern, str_value):
-                        date_count += 1
-                        break
+            boolean_count, numeric_count, date_count, integer_count = (
+                count_value_kinds(col_data)
+            )
 
             total_values = len(col_data)
 
@@ -138,25 +179,16 @@ class DataAnalyzer:
                 data_types[col] = "date"
             elif numeric_count / total_values >= 0.8:
                 # 整数か小数点数かを判定
-                integer_count = 0
-                for value in col_data:
-                    str_value = str(value).strip().replace(",", "")
-                    try:
-                        float_val = float(str_value)
-                        if float_val.is_integer():
-                            integer_count += 1
-                    except (ValueError, TypeError):
-                        pass
-
                 if integer_count / numeric_count >= 0.9:
                     data_types[col] = "integer"
                 else:
                     data_types[col] = "number"
             else:
                 # カテゴリ型かどうかを判定
-                unique_ratio = len(col_data.unique()) / total_values
+                unique_count = len(col_data.unique())
+                unique_ratio = unique_count / total_values
                 if (
-                    unique_ratio <= 0.1 and len(col_data.unique()) <= 20
+                    unique_ratio <= 0.1 and unique_count <= 20
                 ):  # 重複が多くユニーク値が少ない
                     data_types[col] = "category"
                 else:
@@ -165,8 +197,15 @@ class DataAnalyzer:
         return data_types
 
     @staticmethod
-    def analyze_data_quality(df: pd.DataFrame) -> Dict[str, Any]:
-        """データ品質を分析する"""
+    def analyze_data_quality(
+        df: pd.DataFrame, data_types: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        データ品質を分析する
+
+        data_types（analyze_data_typesの結果）を渡すと、integer/number と判定された列だけを
+        数値変換して統計情報を求め、自由記述の文字列列の変換を省く
+        """
         quality_report = {
             "total_rows": len(df),
             "total_columns": len(df.columns),
@@ -190,7 +229,7 @@ class DataAnalyzer:
             # データ一貫性分析
             non_missing_data = col_data.dropna()
             if len(non_missing_data) > 0:
-                unique_count = len(non_missing_data.unique())
+                unique_count = non_missing_data.nunique()
                 unique_ratio = unique_count / len(non_missing_data)
 
                 quality_report["data_consistency"][col] = {
@@ -201,9 +240,24 @@ class DataAnalyzer:
 
                 # 数値列の統計情報
                 try:
-                    numeric_data = pd.to_numeric(
-                        non_missing_data, errors="coerce"
-                    ).dropna()
+                    if is_numeric_dtype(non_missing_data) and not is_bool_dtype(
+                        non_missing_data
+                    ):
+                        # 数値型の列は変換不要
+                        numeric_data = non_missing_data
+                    elif (
+                        data_types is not None
+                        and not is_bool_dtype(non_missing_data)
+                        and data_types.get(col) not in ("integer", "number")
+                    ):
+                        # 数値と判定されなかった列は変換を試みない
+                        # （真偽値型の列は従来どおりTrue=1/False=0として統計情報を求める）
+                        continue
+                    else:
+                        numeric_data = pd.to_numeric(
+                            non_missing_data, errors="coerce"
+                        ).dropna()
+
                     if len(numeric_data) > 0:
                         quality_report["statistics"][col] = {
                             "mean": float(numeric_data.mean()),
@@ -2,19 +2,148 @@
 ファイル処理機能
 """
 
-import uuid
+import asyncio
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO, List, Optional, Union
 from io import BytesIO
 import pandas as pd
 from fastapi import UploadFile, HTTPException
 
-from utils.excel_utils import get_excel_sheets_info
-from services.data_analyzer import DataAnalyzer
+from utils.excel_utils import content_digest, get_excel_sheets_info
+from services.data_analyzer import HEADER_SCAN_ROWS, DataAnalyzer
 from services.session_manager import SessionManager
+from utils.dataframe_utils import downcast_integer_columns, pack_dataframe
 
 logger = logging.getLogger(__name__)
 
+# pyarrowがあればマルチスレッドのC++パーサでCSVを読み込む
+try:
+    import pyarrow
+    import pyarrow.csv
+
+    # pandasのread_csvが欠損値とみなす文字列（pyarrowで直接読み込む場合も同じ値を欠損値にする）
+    from pandas._libs.parsers import STR_NA_VALUES
+
+    CSV_READ_ENGINE = "pyarrow"
+except ImportError:
+    CSV_READ_ENGINE = "c"
+
+# python-calamine（Rust実装のxlsx/xlsパーサ）があればExcelの読み込みに使う
+try:
+    import python_calamine  # noqa: F401
+
+    EXCEL_READ_ENGINE: Optional[str] = "calamine"
+except ImportError:
+    EXCEL_READ_ENGINE = None
+
+# pandasのdtype.kindから簡潔なデータ型名への対応表
+DTYPE_KIND_LABELS = {
+    "i": "integer",
+    "u": "integer",
+    "f": "number",
+    "b": "boolean",
+    "M": "date",
+}
+
+# ファイル内容（バイト列、またはアップロードされたファイルオブジェクト）
+FileSource = Union[bytes, BinaryIO]
+
+
+def open_source(file_content: FileSource) -> BinaryIO:
+    """ファイル内容を先頭から読めるファイルオブジェクトとして返す"""
+    if isinstance(file_content, bytes):
+        return BytesIO(file_content)
+
+    file_content.seek(0)
+    return file_content
+
+
+def probe_csv_schema(file_content: FileSource, skiprows: int) -> "pyarrow.Schema":
+    """
+    pyarrowが推論する列名と型を返す
+
+    pyarrowは先頭ブロックだけから列の型を推論するため、先頭ブロックだけを読み込む（全行は解析しない）
+    """
+    reader = pyarrow.csv.open_csv(
+        open_source(file_content),
+        read_options=pyarrow.csv.ReadOptions(skip_rows=skiprows),
+    )
+    schema = reader.schema
+    reader.close()
+    return schema
+
+
+def read_csv_arrow(
+    file_content: FileSource, skiprows: int, text_columns: List[str]
+) -> pd.DataFrame:
+    """
+    pyarrowのCSVパーサで読み込む（text_columnsの列は推論せず文字列のまま読み込む）
+
+    pandasのpyarrowエンジンはskiprowsを無視し、日付の列の型も指定できないため、pyarrowを直接使う。
+    欠損値の判定と全て欠損値の列の型はpandasのpyarrowエンジンと揃える
+    """
+    table = pyarrow.csv.read_csv(
+        open_source(file_content),
+        read_options=pyarrow.csv.ReadOptions(skip_rows=skiprows),
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types={name: pyarrow.string() for name in text_columns},
+            null_values=sorted(STR_NA_VALUES),
+            strings_can_be_null=True,
+        ),
+    )
+
+    # 全て欠損値の列（null型）はpandasと同じくfloat64にする
+    schema = table.schema
+    for position, arrow_type in enumerate(schema.types):
+        if pyarrow.types.is_null(arrow_type):
+            schema = schema.set(
+                position, schema.field(position).with_type(pyarrow.float64())
+            )
+    return table.cast(schema).to_pandas()
+
+
+def read_csv_bytes(file_content: FileSource, skiprows: int = 0) -> pd.DataFrame:
+    """
+    CSVのファイル内容をDataFrameに読み込む
+
+    pyarrowはISO形式の日付・時刻を日付型に変換して元の表記（"2024-01-01"など）が失われるため、
+    先頭ブロックのスキーマからそのような列を求め、文字列型を指定して全体を1回だけ解析する。
+    pyarrowで読み込めない内容（列数が不揃いな行など）は標準のCパーサで読み直す
+    """
+    if CSV_READ_ENGINE == "pyarrow":
+        try:
+            schema = probe_csv_schema(file_content, skiprows)
+
+            # 列名が重複・空の場合はpandasと同じ列名の補正ができないためCパーサで読み込む
+            if all(schema.names) and len(set(schema.names)) == len(schema.names):
+                temporal_columns = [
+                    field.name
+                    for field in schema
+                    if pyarrow.types.is_temporal(field.type)
+                ]
+                return read_csv_arrow(file_content, skiprows, temporal_columns)
+        except Exception as e:
+            logger.debug(f"pyarrow CSV parse failed, falling back to C parser: {e}")
+
+    return pd.read_csv(open_source(file_content), skiprows=skiprows)
+
+
+def read_excel_source(file_content: FileSource, **kwargs: Any) -> pd.DataFrame:
+    """
+    Excelのファイル内容をDataFrameに読み込む
+
+    calamineで読み込めない場合はpandasの既定エンジン（openpyxl/xlrd）で読み直す
+    """
+    if EXCEL_READ_ENGINE:
+        try:
+            return pd.read_excel(
+                open_source(file_content), engine=EXCEL_READ_ENGINE, **kwargs
+            )
+        except Exception as e:
+            logger.debug(f"calamine Excel parse failed, falling back: {e}")
+
+    return pd.read_excel(open_source(file_content), **kwargs)
+
 
 class FileProcessor:
     """ファイル処理機能を提供するクラス"""
@@ -24,12 +153,28 @@ class FileProcessor:
 
     async def process_csv_advanced(
         self,
-        file_content: bytes,
+        file_content: FileSource,
+        filename: str,
+        session_id: str,
+        session_manager: SessionManager,
+    ) -> Dict[str, Any]:
+        """CSV ファイルを高度に解析する（解析処理はスレッドプールで実行）"""
+        return await asyncio.to_thread(
+            self._process_csv_advanced,
+            file_content,
+            filename,
+            session_id,
+            session_manager,
+        )
+
+    def _process_csv_advanced(
+        self,
+        file_content: FileSource,
         filename: str,
         session_id: str,
         session_manager: SessionManager,
     ) -> Dict[str, Any]:
-        """CSV ファイルを高度に解析する"""
+        """CSV ファイルを高度に解析する（ブロッキング）"""
         try:
             logger.info(
                 f"Advanced processing CSV file: {filename} (session: {session_id})"
@@ -38,23 +183,21 @@ class FileProcessor:
             # セッションデータを作成
             session = session_manager.create_session(session_id)
 
-            # CSVファイルを読み込み（ヘッダーなしで読み込んで後で判定）
-            df_raw = pd.read_csv(BytesIO(file_content), header=None)
+            # ヘッダー判定用に先頭行のみをヘッダーなしで読み込む（全行の解析は1回だけ行う）
+            df_raw = pd.read_csv(
+                open_source(file_content), header=None, nrows=HEADER_SCAN_ROWS
+            )
 
             # ヘッダー行を検出
             header_row = self.data_analyzer.detect_header_row(df_raw)
 
-            # ヘッダー行を使用してデータフレームを再構成
-            if header_row > 0:
-                # ヘッダー行より前の行を削除
-                df_raw = df_raw.iloc[header_row:].reset_index(drop=True)
-
-            # 1行目を列名として使用
-            df = pd.read_csv(BytesIO(file_content), skiprows=header_row)
+            # 1行目を列名として使用（整数列は値の範囲に合わせて縮小し、保持するメモリを減らす）
+            df = downcast_integer_columns(
+                read_csv_bytes(file_content, skiprows=header_row)
+            )
 
-            # セッションにデータを保存
-            session["raw_data"] = df_raw
-            session["processed_data"] = df
+            # セッションにデータを保存（DataFrameはParquetのバイト列に圧縮して保持）
+            session["processed_data"] = pack_dataframe(df)
             session["file_info"] = {
                 "filename": filename,
                 "file_type": "csv",
@@ -67,7 +210,7 @@ class FileProcessor:
             data_types = self.data_analyzer.analyze_data_types(df)
 
             # データ品質分析
-            quality_report = self.data_analyzer.analyze_data_quality(df)
+            quality_report = self.data_analyzer.analyze_data_quality(df, data_types)
 
             # 分析結果をセッションに保存
             session["analysis_result"] = {
@@ -80,7 +223,7 @@ class FileProcessor:
             total_rows = len(df)
 
             # サンプルデータを取得（最初の5行）
-            sample_data = df.head(5).fillna("").to_dict("records")
+            sample_data = df.iloc[:5].fillna("").to_dict("records")
 
             return {
                 "file_type": "csv",
@@ -124,36 +267,32 @@ class FileProcessor:
                 detail=f"CSVファイルの処理中にエラーが発生しました: {str(e)}",
             )
 
-    async def process_excel(self, file_content: bytes, filename: str) -> Dict[str, Any]:
-        """Excel ファイルを処理する（基本版）"""
+    async def process_excel(
+        self, file_content: FileSource, filename: str
+    ) -> Dict[str, Any]:
+        """Excel ファイルを処理する（基本版、読み込みはスレッドプールで実行）"""
+        return await asyncio.to_thread(self._process_excel, file_content, filename)
+
+    def _process_excel(self, file_content: FileSource, filename: str) -> Dict[str, Any]:
+        """Excel ファイルを処理する（ブロッキング）"""
         try:
             logger.info(f"Processing Excel file: {filename}")
 
             # 現段階では基本的な読み込みのみ実装
-            df = pd.read_excel(BytesIO(file_content))
+            df = read_excel_source(file_content)
 
             # 基本情報を取得
             columns = df.columns.tolist()
             total_rows = len(df)
 
-            # データ型を推論
-            data_types = {}
-            for col in columns:
-                dtype = str(df[col].dtype)
-                # pandasのデータ型を簡潔な形式に変換
-                if dtype.startswith("int"):
-                    data_types[col] = "integer"
-                elif dtype.startswith("float"):
-                    data_types[col] = "number"
-                elif dtype.startswith("bool"):
-                    data_types[col] = "boolean"
-                elif dtype.startswith("datetime"):
-                    data_types[col] = "date"
-                else:
-                    data_types[col] = "string"
+            # データ型を推論（pandasのdtype.kindを簡潔な形式に変換）
+            data_types = {
+                col: DTYPE_KIND_LABELS.get(dtype.kind, "string")
+                for col, dtype in zip(columns, df.dtypes)
+            }
 
             # サンプルデータを取得（最初の5行）
-            sample_data = df.head(5).to_dict("records")
+            sample_data = df.iloc[:5].to_dict("records")
 
             return {
                 "file_type": "excel",
@@ -200,7 +339,9 @@ class FileProcessor:
             }
 
             # ワークブックデータも保存（バイト形式で保存）
+            # ハッシュはセッション破棄時に解析結果のキャッシュを破棄するために保持する
             session["raw_workbook_data"] = file_content
+            session["content_digest"] = content_digest(file_content)
 
             return {
                 "filename": filename,
@@ -63,6 +63,26 @@ class FileValidator:
                 detail=f"ファイルサイズが大きすぎます（最大10MB）: {len(content)} bytes",
             )
 
+    @staticmethod
+    def validate_upload_size(file: UploadFile) -> None:
+        """
+        アップロードファイルのサイズを内容を読み込まずに検証する
+
+        UploadFileの内容は受信時に一時ファイルへ書き出されているため、
+        メモリ上にバイト列として展開せずにサイズだけを確認する
+        """
+        size = file.size
+        if size is None:
+            file.file.seek(0, os.SEEK_END)
+            size = file.file.tell()
+            file.file.seek(0)
+
+        if size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"ファイルサイズが大きすぎます（最大10MB）: {size} bytes",
+            )
+
     @staticmethod
     def validate_excel_file(file: UploadFile) -> bool:
         """Excelファイルの妥当性をチェック"""
@@ -2,11 +2,16 @@
 セッション管理
 """
 
+from collections import OrderedDict
 from typing import Dict, Optional, Any, List
 from datetime import datetime, timedelta
+import asyncio
 import logging
+import threading
 
 from models.table_models import SessionData
+from services.table_detector import evict_detection_cache
+from utils.excel_utils import evict_workbook_cache
 
 logger = logging.getLogger(__name__)
 
@@ -14,39 +19,69 @@ logger = logging.getLogger(__name__)
 class SessionManager:
     """セッション管理クラス"""
 
-    def __init__(self, timeout_minutes: int = 30):
-        self.sessions: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, timeout_minutes: int = 30, max_sessions: int = 128):
+        # 最終アクセスの古い順に並べ、期限切れと上限超過のどちらも先頭から破棄する
+        # （アップロードが集中しても期限切れを待たずにメモリ使用量を抑える）
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_sessions = max_sessions
         self.timestamps: Dict[str, datetime] = {}
         self.timeout = timedelta(minutes=timeout_minutes)
+        # セッション作成はスレッドプールからも呼ばれるため、並び順と最終アクセス時刻の更新を排他する
+        self._lock = threading.Lock()
 
     def cleanup_expired_sessions(self) -> int:
         """期限切れのセッションをクリーンアップ"""
-        current_time = datetime.now()
+        current_time = self.get_current_time()
         expired_sessions = []
+        expired_digests = []
+
+        with self._lock:
+            # 最終アクセスの古いものから、期限内のセッションに当たるまで取り出す（全セッションは走査しない）
+            while self.sessions:
+                session_id = next(iter(self.sessions))
+                if current_time - self.timestamps[session_id] <= self.timeout:
+                    break
 
-        for session_id, timestamp in self.timestamps.items():
-            if current_time - timestamp > self.timeout:
                 expired_sessions.append(session_id)
+                _, session = self.sessions.popitem(last=False)
+                expired_digests.append(session.get("content_digest"))
+                del self.timestamps[session_id]
 
         for session_id in expired_sessions:
-            if session_id in self.sessions:
-                del self.sessions[session_id]
-            if session_id in self.timestamps:
-                del self.timestamps[session_id]
             logger.info(f"Expired session cleaned up: {session_id}")
+        self.evict_cached_results(expired_digests)
 
         return len(expired_sessions)
 
+    async def run_cleanup_loop(self, interval_seconds: float = 60) -> None:
+        """期限切れセッションのクリーンアップを一定間隔で実行し続ける（lifespanでタスクとして起動）"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self.cleanup_expired_sessions()
+            except Exception as e:
+                logger.warning(f"Session cleanup failed: {e}")
+
+    def is_expired(self, session_id: str, current_time: datetime) -> bool:
+        """最終アクセスからタイムアウト時間を過ぎているか（未登録のセッションもTrue）"""
+        timestamp = self.timestamps.get(session_id)
+        return timestamp is None or current_time - timestamp > self.timeout
+
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """セッションデータを取得"""
-        self.cleanup_expired_sessions()
-
-        if session_id not in self.sessions:
+        # 全体のクリーンアップはバックグラウンドで行い、ここでは対象のセッションの期限だけを確認する
+        current_time = self.get_current_time()
+        if session_id not in self.sessions or self.is_expired(session_id, current_time):
             return None
 
-        # アクセス時刻を更新
-        self.timestamps[session_id] = datetime.now()
-        return self.sessions[session_id]
+        # アクセス時刻を更新し、LRUの末尾に移す
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            self.sessions.move_to_end(session_id)
+            self.timestamps[session_id] = current_time
+        return session
 
     def get_session_data(self, session_id: str) -> Optional[Dict[str, Any]]:
         """セッションデータを取得（エイリアス）"""
@@ -58,44 +93,84 @@ class SessionManager:
             return False
         
         self.sessions[session_id].update(data)
-        self.timestamps[session_id] = datetime.now()  # アクセス時刻を更新
+        # アクセス時刻を更新し、末尾に移す
+        with self._lock:
+            if session_id in self.sessions:
+                self.sessions.move_to_end(session_id)
+                self.timestamps[session_id] = self.get_current_time()
         
         logger.info(f"Session data updated: {session_id}")
         return True
 
     def create_session(self, session_id: str) -> Dict[str, Any]:
         """新しいセッションを作成"""
-        self.cleanup_expired_sessions()
-
-        self.sessions[session_id] = {
-            "raw_data": None,
+        current_time = self.get_current_time()
+        session = {
             "processed_data": None,
             "analysis_result": {},
             "metadata": {},
             "file_info": {},
         }
-        self.timestamps[session_id] = datetime.now()
-        return self.sessions[session_id]
+        with self._lock:
+            self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            self.timestamps[session_id] = current_time
+
+            # 上限を超えた分は最も長くアクセスされていないセッションから破棄する
+            evicted_sessions = []
+            evicted_digests = []
+            while len(self.sessions) > self.max_sessions:
+                evicted_id, evicted_session = self.sessions.popitem(last=False)
+                self.timestamps.pop(evicted_id, None)
+                evicted_sessions.append(evicted_id)
+                evicted_digests.append(evicted_session.get("content_digest"))
+
+        for evicted_id in evicted_sessions:
+            logger.info("Session evicted (capacity %d): %s", self.max_sessions, evicted_id)
+        self.evict_cached_results(evicted_digests)
+        return session
 
     def delete_session(self, session_id: str) -> bool:
         """セッションを削除"""
-        deleted = False
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            deleted = True
-        if session_id in self.timestamps:
-            del self.timestamps[session_id]
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            self.timestamps.pop(session_id, None)
+
+        if session is None:
+            return False
+
+        logger.info(f"Session deleted: {session_id}")
+        self.evict_cached_results([session.get("content_digest")])
+        return True
 
-        if deleted:
-            logger.info(f"Session deleted: {session_id}")
-        return deleted
+    def evict_cached_results(self, digests: List[Optional[bytes]]) -> None:
+        """
+        破棄したセッションのファイルの解析結果をキャッシュから破棄する
+
+        同じ内容のファイルを残りのセッションが参照している場合は破棄しない
+        """
+        digests = {digest for digest in digests if digest is not None}
+        if not digests:
+            return
+
+        with self._lock:
+            digests.difference_update(
+                session.get("content_digest") for session in self.sessions.values()
+            )
+
+        for digest in digests:
+            evict_workbook_cache(digest)
+            evict_detection_cache(digest)
 
     def list_active_sessions(self) -> List[Dict[str, Any]]:
         """アクティブなセッション一覧を取得"""
-        self.cleanup_expired_sessions()
+        current_time = self.get_current_time()
 
         sessions_info = []
-        for session_id, timestamp in self.timestamps.items():
+        for session_id, timestamp in list(self.timestamps.items()):
+            # 次回のクリーンアップを待っている期限切れのセッションは含めない
+            if current_time - timestamp > self.timeout:
+                continue
             session = self.sessions.get(session_id, {})
             file_info = session.get("file_info", {})
 
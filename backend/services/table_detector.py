@@ -3,16 +3,92 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Tuple
 import logging
-from io import BytesIO
 import re
-import openpyxl
+import threading
+import weakref
+
+import numpy as np
+
+# scipyがあればデータ領域の連結成分の抽出をndimage（C実装）で行う
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
 
 from models.table_models import TableCandidate
+from services.data_analyzer import is_numeric_text
+from utils.excel_utils import (
+    content_digest,
+    load_sheet_values_cached,
+    slice_sheet_values,
+)
 
 logger = logging.getLogger(__name__)
 
+# 列の値を日付とみなす表記（YYYY-MM-DD / YYYY/MM/DD の前方一致）
+DATE_PATTERN = re.compile(r"\d{4}[-/]\d{1,2}[-/]\d{1,2}")
+
+
+# セル値を前後の空白を除いた文字列に変換する（Noneは空文字列）
+_cell_text = np.frompyfunc(lambda value: "" if value is None else str(value).strip(), 1, 1)
+_is_numeric_text = np.frompyfunc(is_numeric_text, 1, 1)
+_is_date_text = np.frompyfunc(lambda text: DATE_PATTERN.match(text) is not None, 1, 1)
+
+# セルの種類を表すタグ（日付は数値とみなせない値だけに付ける）
+CELL_EMPTY = 0
+CELL_NUMERIC = 1
+CELL_DATE = 2
+CELL_STRING = 3
+
+
+# 検出結果を保持する件数（同じアップロード・シート・検出条件の再検出で再利用する）
+DETECTION_CACHE_SIZE = 32
+
+# 検出結果をキャッシュしている検出器（セッション破棄時にまとめて破棄するため）
+_caching_detectors: "weakref.WeakSet[StatisticalTableDetector]" = weakref.WeakSet()
+
+# 表候補のランキングに使うスコア（領域ごとに1行。ヘッダーがない場合のheader_row_idxは-1）
+REGION_SCORE_DTYPE = np.dtype(
+    [
+        ("region_idx", np.int32),
+        ("quality_score", np.float64),
+        ("data_density", np.float64),
+        ("header_row_idx", np.int32),
+        ("data_cells", np.int32),
+    ]
+)
+
+
+def classify_cells(cell_texts: np.ndarray) -> np.ndarray:
+    """セルの文字列表現の2次元配列から、セルの種類のタグ（int8）の配列を作成"""
+    tags = np.full(cell_texts.shape, CELL_EMPTY, dtype=np.int8)
+    non_empty_mask = cell_texts != ""
+    if not non_empty_mask.any():
+        return tags
+
+    non_empty_texts = cell_texts[non_empty_mask]
+    numeric_mask = _is_numeric_text(non_empty_texts).astype(bool)
+    date_mask = np.zeros_like(numeric_mask)
+    date_mask[~numeric_mask] = _is_date_text(non_empty_texts[~numeric_mask]).astype(bool)
+
+    tags[non_empty_mask] = np.where(
+        numeric_mask, CELL_NUMERIC, np.where(date_mask, CELL_DATE, CELL_STRING)
+    )
+    return tags
+
+
+def evict_detection_cache(digest: bytes) -> None:
+    """
+    指定したハッシュのファイルの検出結果を全ての検出器のキャッシュから破棄する
+
+    セッションの削除・期限切れ時に呼び出し、不要になった検出結果をプロセスに残さない
+    """
+    for detector in list(_caching_detectors):
+        detector.evict(digest)
+
 
 class TableDetector(ABC):
     """表検出器の抽象基底クラス - 将来的なLLM置き換えに対応"""
@@ -53,6 +129,18 @@ class StatisticalTableDetector(TableDetector):
     def __init__(self):
         self.name = "Statistical Table Detector"
         self.version = "1.0.0"
+        # (ファイル内容のハッシュ, シート名, min_rows, min_cols, max_tables) をキーにした検出結果のLRU
+        self._detection_cache: "OrderedDict[Tuple[Any, ...], List[TableCandidate]]" = (
+            OrderedDict()
+        )
+        self._detection_cache_lock = threading.Lock()
+        _caching_detectors.add(self)
+
+    def evict(self, digest: bytes) -> None:
+        """指定したハッシュのファイルの検出結果をキャッシュから破棄する"""
+        with self._detection_cache_lock:
+            for key in [key for key in self._detection_cache if key[0] == digest]:
+                del self._detection_cache[key]
 
     def get_detector_info(self) -> Dict[str, Any]:
         """検出器の情報を返す"""
@@ -71,121 +159,178 @@ class StatisticalTableDetector(TableDetector):
         min_cols: int = 2,
         max_tables: int = 10,
     ) -> List[TableCandidate]:
-        """統計的手法で表を検出"""
-        try:
-            workbook = openpyxl.load_workbook(BytesIO(workbook_data), read_only=True)
-            sheet = workbook[sheet_name]
+        """
+        統計的手法で表を検出
 
-            # データ領域を分析
-            data_regions = self._find_data_regions(sheet)
-            table_candidates = []
+        検出結果は入力が同じなら変わらないため、同じ条件の再検出には前回の結果を返す
+        （検出に失敗した場合はキャッシュしない）
+        """
+        cache_key = (
+            content_digest(workbook_data),
+            sheet_name,
+            min_rows,
+            min_cols,
+            max_tables,
+        )
+        with self._detection_cache_lock:
+            table_candidates = self._detection_cache.get(cache_key)
+            if table_candidates is not None:
+                self._detection_cache.move_to_end(cache_key)
+                return list(table_candidates)
 
-            for region_id, region in enumerate(data_regions):
-                # 各領域を表候補として評価
-                candidate = self._analyze_data_region(
-                    sheet, region, f"table_{region_id + 1}", sheet_name
-                )
+        try:
+            table_candidates = self._detect_tables(
+                workbook_data, sheet_name, min_rows, min_cols, max_tables
+            )
+        except Exception as e:
+            logger.error(f"Error detecting tables in sheet {sheet_name}: {str(e)}")
+            return []
 
-                if (
-                    candidate
-                    and candidate.row_count >= min_rows
-                    and candidate.col_count >= min_cols
-                ):
-                    table_candidates.append(candidate)
+        with self._detection_cache_lock:
+            self._detection_cache[cache_key] = table_candidates
+            self._detection_cache.move_to_end(cache_key)
+            while len(self._detection_cache) > DETECTION_CACHE_SIZE:
+                self._detection_cache.popitem(last=False)
 
-            # 品質スコアでソート
-            table_candidates.sort(key=lambda x: x.quality_score, reverse=True)
+        return list(table_candidates)
 
-            workbook.close()
-            return table_candidates[:max_tables]
+    def _detect_tables(
+        self,
+        workbook_data: bytes,
+        sheet_name: str,
+        min_rows: int,
+        min_cols: int,
+        max_tables: int,
+    ) -> List[TableCandidate]:
+        """シートを読み込んで表候補を検出し、品質スコアの降順で返す"""
+        # 表抽出と同じ読み込み済みのセル値を再利用する（python-calamineがあればRust実装で読み込む）
+        sheet_values = load_sheet_values_cached(workbook_data, sheet_name)
+
+        # データ領域を分析
+        data_regions = self._find_data_regions(sheet_values)
+
+        # 最小サイズを満たす領域だけを採点する
+        region_scores = np.zeros(len(data_regions), dtype=REGION_SCORE_DTYPE)
+        scored_count = 0
+        for region_idx, region in enumerate(data_regions):
+            if (
+                region["end_row"] - region["start_row"] + 1 < min_rows
+                or region["end_col"] - region["start_col"] + 1 < min_cols
+            ):
+                continue
 
-        except Exception as e:
-            logger.error(f"Error detecting tables in sheet {sheet_name}: {str(e)}")
+            score = self._score_data_region(sheet_values, region)
+            if score is not None:
+                region_scores[scored_count] = (region_idx, *score)
+                scored_count += 1
+        region_scores = region_scores[:scored_count]
+
+        # 品質スコアの降順（同点は検出順）に並べ、上位の領域だけヘッダーとサンプルデータを取り出す
+        ranking = np.argsort(-region_scores["quality_score"], kind="stable")
+        return [
+            self._build_table_candidate(
+                sheet_values,
+                data_regions[int(region_score["region_idx"])],
+                f"table_{int(region_score['region_idx']) + 1}",
+                sheet_name,
+                region_score,
+            )
+            for region_score in region_scores[ranking[:max_tables]]
+        ]
+
+    def _find_data_regions(self, sheet_values) -> List[Dict[str, int]]:
+        """データ領域を検出する（sheet_valuesはA1からのセル値の行のリスト）"""
+        data_mask = self._build_data_mask(sheet_values)
+        if not data_mask.any():
             return []
 
-    def _find_data_regions(self, sheet) -> List[Dict[str, int]]:
-        """データ領域を検出する"""
+        # 上下をデータに挟まれた1行だけの空行は同じ領域とみなす（2行以上空いたら別の表）
+        bridged_mask = data_mask.copy()
+        bridged_mask[1:-1] |= data_mask[:-2] & data_mask[2:]
+
+        # 斜めを含めて隣接するデータセルの塊ごとに外接矩形を求める
         regions = []
-        max_row = sheet.max_row or 1
-        max_col = sheet.max_column or 1
-
-        # データ密度マップを作成
-        data_map = {}
-        for row in range(1, min(max_row + 1, 201)):  # 最大200行まで分析
-            for col in range(1, min(max_col + 1, 51)):  # 最大50列まで分析
-                cell_value = sheet.cell(row, col).value
-                has_data = (
-                    cell_value is not None
-                    and str(cell_value).strip() != ""
-                    and str(cell_value).strip() != "0"
+        for row_slice, col_slice in self._label_data_regions(bridged_mask):
+            if row_slice.stop - row_slice.start >= 3:
+                regions.append(
+                    {
+                        "start_row": row_slice.start + 1,
+                        "end_row": row_slice.stop,
+                        "start_col": col_slice.start + 1,
+                        "end_col": col_slice.stop,
+                    }
                 )
-                data_map[(row, col)] = has_data
 
-        # 連続するデータブロックを検出
-        visited = set()
+        return regions
 
-        for row in range(1, min(max_row + 1, 201)):
-            for col in range(1, min(max_col + 1, 51)):
-                if (row, col) not in visited and data_map.get((row, col), False):
-                    region = self._expand_data_region(
-                        data_map, row, col, visited, max_row, max_col
-                    )
-                    if region and (region["end_row"] - region["start_row"] + 1) >= 3:
-                        regions.append(region)
+    @staticmethod
+    def _label_data_regions(data_mask: np.ndarray) -> List[Tuple[slice, slice]]:
+        """
+        8近傍で連結したデータセルの塊ごとの外接矩形（行・列のスライス）を返す
 
-        return regions
+        塊の並びは左上から行方向に走査して最初に現れた順。scipyがない場合は同じ結果を幅優先探索で求める
+        """
+        if ndimage is not None:
+            labels, _ = ndimage.label(data_mask, structure=np.ones((3, 3), dtype=bool))
+            return [
+                region_slices
+                for region_slices in ndimage.find_objects(labels)
+                if region_slices is not None
+            ]
+
+        scan_rows, scan_cols = data_mask.shape
+        visited = np.zeros_like(data_mask, dtype=bool)
+        bounding_boxes = []
+
+        for start_row, start_col in zip(*np.nonzero(data_mask)):
+            if visited[start_row, start_col]:
+                continue
+
+            visited[start_row, start_col] = True
+            queue = deque([(start_row, start_col)])
+            top, bottom, left, right = start_row, start_row, start_col, start_col
+            while queue:
+                row, col = queue.popleft()
+                top, bottom = min(top, row), max(bottom, row)
+                left, right = min(left, col), max(right, col)
+                for next_row in range(max(row - 1, 0), min(row + 2, scan_rows)):
+                    for next_col in range(max(col - 1, 0), min(col + 2, scan_cols)):
+                        if (
+                            data_mask[next_row, next_col]
+                            and not visited[next_row, next_col]
+                        ):
+                            visited[next_row, next_col] = True
+                            queue.append((next_row, next_col))
+
+            bounding_boxes.append(
+                (slice(int(top), int(bottom) + 1), slice(int(left), int(right) + 1))
+            )
 
-    def _expand_data_region(
-        self, data_map, start_row, start_col, visited, max_row, max_col
-    ):
-        """データ領域を拡張する"""
-        # 領域の境界を探索
-        min_row, max_row_found = start_row, start_row
-        min_col, max_col_found = start_col, start_col
-
-        # 行方向の拡張
-        for row in range(start_row, min(max_row + 1, 201)):
-            has_data_in_row = False
-            for col in range(start_col, min(max_col + 1, 51)):
-                if data_map.get((row, col), False):
-                    has_data_in_row = True
-                    max_col_found = max(max_col_found, col)
-                    break
-            if has_data_in_row:
-                max_row_found = row
-            else:
-                # 連続する2行以上空行があったら終了
-                if row > start_row + 1:
-                    break
-
-        # 列方向の拡張
-        for col in range(start_col, min(max_col + 1, 51)):
-            has_data_in_col = False
-            for row in range(start_row, max_row_found + 1):
-                if data_map.get((row, col), False):
-                    has_data_in_col = True
-                    break
-            if has_data_in_col:
-                max_col_found = col
-            else:
-                break
-
-        # 訪問済みマークを設定
-        for row in range(min_row, max_row_found + 1):
-            for col in range(min_col, max_col_found + 1):
-                visited.add((row, col))
+        return bounding_boxes
 
-        return {
-            "start_row": min_row,
-            "end_row": max_row_found,
-            "start_col": min_col,
-            "end_col": max_col_found,
-        }
+    def _build_data_mask(self, sheet_values) -> np.ndarray:
+        """分析範囲（最大200行×50列）のセルにデータがあるかを表す真偽値の行列を作成"""
+        scan_rows = min(len(sheet_values), 200)  # 最大200行まで分析
+        row_widths = [len(row_values) for row_values in sheet_values[:scan_rows]]
+        scan_cols = min(max(row_widths, default=0), 50)  # 最大50列まで分析
+
+        data_mask = np.zeros((scan_rows, scan_cols), dtype=bool)
+        for row_idx, row_values in enumerate(sheet_values[:scan_rows]):
+            for col_idx, cell_value in enumerate(row_values[:scan_cols]):
+                if cell_value is not None:
+                    text = str(cell_value).strip()
+                    data_mask[row_idx, col_idx] = text != "" and text != "0"
+
+        return data_mask
 
-    def _analyze_data_region(
-        self, sheet, region, table_id, sheet_name
-    ) -> Optional[TableCandidate]:
-        """データ領域を表として分析する"""
+    def _score_data_region(
+        self, sheet_values, region
+    ) -> Optional[Tuple[float, float, int, int]]:
+        """
+        データ領域を表として採点する
+
+        (品質スコア, データ密度, ヘッダー行の領域内の位置（なければ-1）, データのあるセル数) を返す
+        """
         try:
             start_row = region["start_row"]
             end_row = region["end_row"]
@@ -195,125 +340,140 @@ class StatisticalTableDetector(TableDetector):
             row_count = end_row - start_row + 1
             col_count = end_col - start_col + 1
 
-            # データ収集
-            data_matrix = []
-            for row in range(start_row, end_row + 1):
-                row_data = []
-                for col in range(start_col, end_col + 1):
-                    cell_value = sheet.cell(row, col).value
-                    row_data.append(cell_value)
-                data_matrix.append(row_data)
+            # データ収集（行のリストを経由せずに2次元配列へ直接書き込む。シートの範囲外はNoneのまま）
+            cell_values = np.empty((row_count, col_count), dtype=object)
+            for row_idx, row_values in enumerate(sheet_values[start_row - 1 : end_row]):
+                region_values = row_values[start_col - 1 : end_col]
+                cell_values[row_idx, : len(region_values)] = region_values
 
-            # ヘッダー行を検出
-            header_row_idx = self._detect_header_row(data_matrix)
-            header_row = (
-                start_row + header_row_idx if header_row_idx is not None else None
-            )
+            # セルの文字列表現を1回だけ求め、密度と一貫性の計算で共有する
+            cell_tags = classify_cells(_cell_text(cell_values))
 
-            # ヘッダー取得
-            headers = []
-            if header_row_idx is not None:
-                header_data = data_matrix[header_row_idx]
-                headers = [
-                    str(cell) if cell is not None else f"列{i+1}"
-                    for i, cell in enumerate(header_data)
-                ]
-            else:
-                headers = [f"列{i+1}" for i in range(col_count)]
-
-            # サンプルデータ取得（ヘッダー + 3行）
-            sample_data = []
-            data_start_idx = (header_row_idx + 1) if header_row_idx is not None else 0
-
-            for i in range(data_start_idx, min(data_start_idx + 3, len(data_matrix))):
-                if i < len(data_matrix):
-                    row_dict = {}
-                    for j, header in enumerate(headers):
-                        if j < len(data_matrix[i]):
-                            value = data_matrix[i][j]
-                            row_dict[header] = str(value) if value is not None else ""
-                        else:
-                            row_dict[header] = ""
-                    sample_data.append(row_dict)
+            # ヘッダー行を検出
+            header_row_idx = self._detect_header_row(cell_tags)
 
             # データ密度計算
             total_cells = row_count * col_count
-            data_cells = sum(
-                1
-                for row in data_matrix
-                for cell in row
-                if cell is not None and str(cell).strip() != ""
-            )
+            data_cells = int(np.count_nonzero(cell_tags))
             data_density = data_cells / total_cells if total_cells > 0 else 0
 
             # 品質スコア計算
             quality_score = self._calculate_quality_score(
-                data_matrix, row_count, col_count, data_density, header_row_idx
-            )
-
-            # 推定レコード数
-            estimated_records = (
-                row_count - 1 if header_row_idx is not None else row_count
+                cell_tags, row_count, col_count, data_density, header_row_idx
             )
 
-            return TableCandidate(
-                table_id=table_id,
-                sheet_name=sheet_name,
-                start_row=start_row,
-                end_row=end_row,
-                start_col=start_col,
-                end_col=end_col,
-                header_row=header_row,
-                quality_score=quality_score,
-                data_density=data_density,
-                row_count=row_count,
-                col_count=col_count,
-                estimated_records=estimated_records,
-                headers=headers,
-                sample_data=sample_data,
-                metadata={
-                    "detection_method": "statistical",
-                    "data_cells": data_cells,
-                    "total_cells": total_cells,
-                },
+            return (
+                quality_score,
+                data_density,
+                header_row_idx if header_row_idx is not None else -1,
+                data_cells,
             )
 
         except Exception as e:
             logger.error(f"Error analyzing data region: {str(e)}")
             return None
 
-    def _detect_header_row(self, data_matrix) -> Optional[int]:
-        """ヘッダー行を検出する"""
-        if len(data_matrix) < 2:
+    def _build_table_candidate(
+        self, sheet_values, region, table_id, sheet_name, region_score
+    ) -> TableCandidate:
+        """採点済みのデータ領域からヘッダーとサンプルデータを取り出して表候補を作成する"""
+        start_row = region["start_row"]
+        end_row = region["end_row"]
+        start_col = region["start_col"]
+        end_col = region["end_col"]
+
+        row_count = end_row - start_row + 1
+        col_count = end_col - start_col + 1
+
+        header_row_idx = int(region_score["header_row_idx"])
+        if header_row_idx < 0:
+            header_row_idx = None
+        header_row = start_row + header_row_idx if header_row_idx is not None else None
+
+        # ヘッダー行とサンプルデータの行だけを取り出す
+        data_start_idx = (header_row_idx + 1) if header_row_idx is not None else 0
+        data_matrix = slice_sheet_values(
+            sheet_values,
+            start_row,
+            min(start_row + data_start_idx + 2, end_row),
+            start_col,
+            end_col,
+        )
+
+        # ヘッダー取得
+        headers = []
+        if header_row_idx is not None:
+            header_data = data_matrix[header_row_idx]
+            headers = [
+                str(cell) if cell is not None else f"列{i+1}"
+                for i, cell in enumerate(header_data)
+            ]
+        else:
+            headers = [f"列{i+1}" for i in range(col_count)]
+
+        # サンプルデータ取得（ヘッダー + 3行）
+        sample_data = []
+        for row_data in data_matrix[data_start_idx : data_start_idx + 3]:
+            row_dict = {}
+            for j, header in enumerate(headers):
+                if j < len(row_data):
+                    value = row_data[j]
+                    row_dict[header] = str(value) if value is not None else ""
+                else:
+                    row_dict[header] = ""
+            sample_data.append(row_dict)
+
+        # 推定レコード数
+        estimated_records = row_count - 1 if header_row_idx is not None else row_count
+        data_cells = int(region_score["data_cells"])
+
+        return TableCandidate(
+            table_id=table_id,
+            sheet_name=sheet_name,
+            start_row=start_row,
+            end_row=end_row,
+            start_col=start_col,
+            end_col=end_col,
+            header_row=header_row,
+            quality_score=float(region_score["quality_score"]),
+            data_density=float(region_score["data_density"]),
+            row_count=row_count,
+            col_count=col_count,
+            estimated_records=estimated_records,
+            headers=headers,
+            sample_data=sample_data,
+            metadata={
+                "detection_method": "statistical",
+                "data_cells": data_cells,
+                "total_cells": row_count * col_count,
+            },
+        )
+
+    def _detect_header_row(self, cell_tags) -> Optional[int]:
+        """ヘッダー行を検出する（cell_tagsはセルの種類のタグの2次元配列）"""
+        if len(cell_tags) < 2:
             return None
 
         best_header_idx = None
         best_score = 0
 
         # 最初の3行までをヘッダー候補として分析
-        for row_idx in range(min(3, len(data_matrix))):
-            row = data_matrix[row_idx]
-
-            # 文字列の割合を計算
-            string_count = 0
-            non_empty_count = 0
-
-            for cell in row:
-                if cell is not None and str(cell).strip() != "":
-                    non_empty_count += 1
-                    # 数値でない場合は文字列とみなす
-                    try:
-                        float(str(cell).replace(",", ""))
-                    except (ValueError, TypeError):
-                        string_count += 1
-
+        candidate_tags = cell_tags[:3]
+        non_empty_counts = np.count_nonzero(candidate_tags, axis=1)
+        # 数値でない場合は文字列とみなす（日付の表記も文字列として数える）
+        string_counts = np.count_nonzero(candidate_tags >= CELL_DATE, axis=1)
+        row_length = cell_tags.shape[1]
+
+        for row_idx, (non_empty_count, string_count) in enumerate(
+            zip(non_empty_counts.tolist(), string_counts.tolist())
+        ):
             if non_empty_count == 0:
                 continue
 
             string_ratio = string_count / non_empty_count
 
             # ヘッダースコア（文字列率 + データ充填率）
-            fill_ratio = non_empty_count / len(row)
+            fill_ratio = non_empty_count / row_length
             header_score = string_ratio * 0.7 + fill_ratio * 0.3
 
             if header_score > best_score and string_ratio >= 0.5:
@@ -323,7 +483,7 @@ class StatisticalTableDetector(TableDetector):
         return best_header_idx
 
     def _calculate_quality_score(
-        self, data_matrix, row_count, col_count, data_density, header_row_idx
+        self, cell_tags, row_count, col_count, data_density, header_row_idx
     ) -> float:
         """表の品質スコアを計算"""
         score = 0.0
@@ -342,65 +502,41 @@ class StatisticalTableDetector(TableDetector):
 
         # データの一貫性による評価 (0-0.2)
         consistency_score = self._calculate_data_consistency(
-            data_matrix, header_row_idx
+            cell_tags, header_row_idx
         )
         score += consistency_score
 
         return min(score, 1.0)
 
-    def _calculate_data_consistency(self, data_matrix, header_row_idx) -> float:
-        """データの一貫性スコアを計算"""
-        if len(data_matrix) <= 1:
+    def _calculate_data_consistency(self, cell_tags, header_row_idx) -> float:
+        """データの一貫性スコアを計算（cell_tagsはセルの種類のタグの2次元配列）"""
+        if len(cell_tags) <= 1:
             return 0.0
 
         data_start = (header_row_idx + 1) if header_row_idx is not None else 0
-        if data_start >= len(data_matrix):
+        if data_start >= len(cell_tags):
             return 0.0
 
-        col_consistency_scores = []
-
-        for col_idx in range(len(data_matrix[0])):
-            col_data = []
-            for row_idx in range(data_start, len(data_matrix)):
-                if col_idx < len(data_matrix[row_idx]):
-                    cell = data_matrix[row_idx][col_idx]
-                    if cell is not None and str(cell).strip() != "":
-                        col_data.append(cell)
-
-            if len(col_data) < 2:
-                continue
-
-            # データ型の一貫性を確認
-            numeric_count = 0
-            date_count = 0
-
-            for value in col_data:
-                str_value = str(value).strip()
-
-                # 数値チェック
-                try:
-                    float(str_value.replace(",", ""))
-                    numeric_count += 1
-                    continue
-                except (ValueError, TypeError):
-                    pass
-
-                # 日付チェック
-                if re.match(r"\d{4}[-/]\d{1,2}[-/]\d{1,2}", str_value):
-                    date_count += 1
-
-            total_values = len(col_data)
-            if total_values > 0:
-                numeric_ratio = numeric_count / total_values
-                date_ratio = date_count / total_values
-
-                # 一貫性スコア（1種類のデータ型が80%以上なら高評価）
-                if numeric_ratio >= 0.8 or date_ratio >= 0.8:
-                    col_consistency_scores.append(1.0)
-                elif numeric_ratio >= 0.6 or date_ratio >= 0.6:
-                    col_consistency_scores.append(0.6)
-                else:
-                    col_consistency_scores.append(0.3)
+        # 列ごとに値の種類を数える
+        data_tags = cell_tags[data_start:]
+        total_values = np.count_nonzero(data_tags, axis=0)
+        numeric_counts = np.count_nonzero(data_tags == CELL_NUMERIC, axis=0)
+        date_counts = np.count_nonzero(data_tags == CELL_DATE, axis=0)
+
+        # 値が2つ未満の列は評価しない
+        target_cols = total_values >= 2
+        numeric_ratio = numeric_counts[target_cols] / total_values[target_cols]
+        date_ratio = date_counts[target_cols] / total_values[target_cols]
+
+        # 一貫性スコア（1種類のデータ型が80%以上なら高評価）
+        col_consistency_scores = np.select(
+            [
+                (numeric_ratio >= 0.8) | (date_ratio >= 0.8),
+                (numeric_ratio >= 0.6) | (date_ratio >= 0.6),
+            ],
+            [1.0, 0.6],
+            default=0.3,
+        ).tolist()
 
         if not col_consistency_scores:
             return 0.0
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+キャッシュユーティリティのテスト
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+import pytest
+
+# パスを追加してユーティリティをインポート
+sys.path.append(str(Path(__file__).parent))
+from utils.cache_utils import async_ttl_cache
+
+
+def test_async_ttl_cache_returns_cached_result_within_ttl():
+    """TTL内の呼び出しは実処理を行わずに前回の結果を返す"""
+    calls = []
+
+    @async_ttl_cache(60)
+    async def probe():
+        calls.append(1)
+        return {"count": len(calls)}
+
+    async def run():
+        return [await probe() for _ in range(3)]
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert results == [{"count": 1}] * 3
+
+
+def test_async_ttl_cache_expires_after_ttl():
+    """TTL経過後は再実行される"""
+    calls = []
+
+    @async_ttl_cache(0)
+    async def probe():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        return [await probe(), await probe()]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_async_ttl_cache_does_not_cache_exceptions():
+    """例外はキャッシュせず、次の呼び出しで再実行する"""
+    calls = []
+
+    @async_ttl_cache(60)
+    async def probe():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("connection failed")
+        return "ok"
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await probe()
+        return await probe()
+
+    assert asyncio.run(run()) == "ok"
+    assert len(calls) == 2
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+データ分析サービスのテスト
+"""
+
+import sys
+from pathlib import Path
+import pandas as pd
+
+# パスを追加してサービスをインポート
+sys.path.append(str(Path(__file__).parent))
+from services.data_analyzer import DataAnalyzer, is_numeric_text
+
+
+def test_detect_header_row_skips_title_rows():
+    """タイトル行や空行の後にある文字列の多い行をヘッダーとして検出する"""
+    df = pd.DataFrame(
+        [
+            ["月次売上", None, None],
+            [None, None, None],
+            ["日付", "勘定科目", "金額"],
+            ["2024/01/01", "売上高", "1,000"],
+            ["2024/01/02", "売上高", "2,000"],
+        ]
+    )
+
+    assert DataAnalyzer.detect_header_row(df) == 2
+
+
+def test_detect_header_row_defaults_to_first_row():
+    """数値ばかりで候補がない場合や空のデータは0行目を返す"""
+    numeric_df = pd.DataFrame([[1, 2, 3], [4, 5, 6]])
+
+    assert DataAnalyzer.detect_header_row(numeric_df) == 0
+    assert DataAnalyzer.detect_header_row(pd.DataFrame()) == 0
+
+
+def test_detect_header_row_treats_fullwidth_and_comma_numbers_as_numeric():
+    """全角数字やカンマ区切りの数値は文字列として数えない"""
+    df = pd.DataFrame(
+        [
+            ["１２", "1,000", "項目"],
+            ["科目", "摘要", "金額"],
+        ]
+    )
+
+    assert DataAnalyzer.detect_header_row(df) == 1
+
+
+def test_analyze_data_types_for_text_columns():
+    """文字列の列は値の表記から型を判定する"""
+    df = pd.DataFrame(
+        {
+            "flag": ["yes", "no", "Y", "n", "TRUE"] * 4,
+            "date": ["2024/01/01", "2024-01-02", "01/03/2024", "2024/01/04", None] * 4,
+            "amount": ["1,000", "2,500", "300", "40", "5"] * 4,
+            "rate": ["1.5", "2.25", "3", "4.75", "0.5"] * 4,
+            "category": ["A", "B"] * 10,
+            "memo": [f"摘要{i}" for i in range(20)],
+            "blank": [None] * 20,
+        }
+    )
+
+    assert DataAnalyzer.analyze_data_types(df) == {
+        "flag": "boolean",
+        "date": "date",
+        "amount": "integer",
+        "rate": "number",
+        "category": "category",
+        "memo": "string",
+        "blank": "empty",
+    }
+
+
+def test_analyze_data_types_for_typed_columns():
+    """数値・真偽値・日時のdtypeの列も文字列表現と同じ基準で判定する"""
+    df = pd.DataFrame(
+        {
+            "id": range(1, 21),
+            "binary": [0, 1] * 10,
+            "price": [100.0, 250.5] * 10,
+            "whole": [1.0, 2.0, None, 3.0] * 5,
+            "active": [True, False] * 10,
+            "created": pd.date_range("2024-01-01", periods=20, freq="D"),
+        }
+    )
+
+    assert DataAnalyzer.analyze_data_types(df) == {
+        "id": "integer",
+        "binary": "boolean",
+        "price": "number",
+        "whole": "integer",
+        "active": "boolean",
+        "created": "date",
+    }
+
+
+def test_analyze_data_quality_uses_data_types_for_statistics():
+    """data_typesを渡すと数値と判定された列だけに統計情報を付ける"""
+    df = pd.DataFrame(
+        {
+            "amount": [100, 200, None, 400],
+            "text_amount": ["10", "20", "30", "40"],
+            "memo": ["a", "1", "b", "a"],
+        }
+    )
+
+    data_types = DataAnalyzer.analyze_data_types(df)
+    report = DataAnalyzer.analyze_data_quality(df, data_types)
+
+    assert set(report["statistics"]) == {"amount", "text_amount"}
+    assert report["statistics"]["text_amount"]["max"] == 40.0
+    assert report["missing_data"]["amount"] == {"count": 1, "ratio": 0.25}
+    assert report["data_consistency"]["memo"]["duplicates"] == 1
+
+
+def test_analyze_data_quality_keeps_statistics_for_bool_columns():
+    """真偽値型の列はbooleanと判定されても、data_typesなしの場合と同じ統計情報を返す"""
+    df = pd.DataFrame({"active": [True, False, True, True]})
+
+    data_types = DataAnalyzer.analyze_data_types(df)
+    report = DataAnalyzer.analyze_data_quality(df, data_types)
+
+    assert data_types == {"active": "boolean"}
+    assert report["statistics"] == DataAnalyzer.analyze_data_quality(df)["statistics"]
+    assert report["statistics"]["active"]["mean"] == 0.75
+
+
+def test_is_numeric_text_accepts_the_same_values_as_float():
+    """カンマを除いてfloat()に変換できる値だけを数値表記とみなす"""
+    numeric_values = ["1,000", " -12.5 ", "+.5e-3", "1_000", "１２", "NaN", "-Infinity", 3]
+    other_values = ["", "科目", "2024/01/05", "1__0", "_1", "1e", "²", "0x10", True, None]
+
+    assert all(is_numeric_text(value) for value in numeric_values)
+    assert not any(is_numeric_text(value) for value in other_values)
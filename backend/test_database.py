@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+データベース操作のテスト（外部サービスには接続しない）
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# パスを追加してデータベースモジュールをインポート
+sys.path.append(str(Path(__file__).parent))
+database = pytest.importorskip("database", exc_type=ImportError)
+
+
+class FailingSupabase:
+    """fail_at回目のinsertで例外を送出するSupabaseクライアント"""
+
+    def __init__(self, fail_at: int):
+        self.fail_at = fail_at
+        self.inserted = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.pending = rows
+        return self
+
+    def execute(self):
+        if len(self.inserted) + 1 == self.fail_at:
+            raise RuntimeError("connection reset")
+        self.inserted.append(self.pending)
+        return type("Response", (), {"data": list(self.pending)})()
+
+
+class RecordingInsert:
+    """insert(...).values(rows).returning(...)の行を保持する"""
+
+    def __init__(self, target_table):
+        self.rows = []
+
+    def values(self, rows):
+        self.rows = rows
+        return self
+
+    def returning(self, *columns):
+        return self
+
+
+class RecordingResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def keys(self):
+        return list(self.rows[0].keys())
+
+    def __iter__(self):
+        return iter([tuple(row.values()) for row in self.rows])
+
+
+class RecordingEngine:
+    """SQLAlchemyのAsyncEngineの代わりに実行したINSERTの行を記録する"""
+
+    def __init__(self):
+        self.inserted = []
+        self.committed = False
+
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        self.inserted.append(statement.rows)
+        return RecordingResult(statement.rows)
+
+    async def commit(self):
+        self.committed = True
+
+
+def test_bulk_insert_fallback_skips_chunks_already_inserted(monkeypatch):
+    """Supabaseが途中のチャンクで失敗した場合、登録済みのチャンクはSQLAlchemyで再登録しない"""
+    supabase = FailingSupabase(fail_at=2)
+    engine = RecordingEngine()
+    monkeypatch.setattr(database, "get_supabase", lambda: supabase)
+    monkeypatch.setattr(database, "get_engine", lambda: engine)
+    monkeypatch.setattr(database, "insert", RecordingInsert)
+    monkeypatch.setattr(database, "BULK_INSERT_CHUNK_SIZE", 2)
+
+    rows = [{"id": f"file-{i}", "upload_status": "uploaded"} for i in range(5)]
+    result = asyncio.run(
+        database.DatabaseManager()._bulk_insert(database.uploaded_files_table, rows)
+    )
+
+    assert supabase.inserted == [rows[0:2]]
+    assert engine.inserted == [rows[2:4], rows[4:5]]
+    assert engine.committed
+    assert result["status"] == "success"
+    assert result["method"] == "Supabase+SQLAlchemy"
+    assert [row["id"] for row in result["data"]] == [row["id"] for row in rows]
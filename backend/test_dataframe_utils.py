@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+DataFrameユーティリティのテスト
+"""
+
+import sys
+from pathlib import Path
+import pandas as pd
+
+# パスを追加してユーティリティをインポート
+sys.path.append(str(Path(__file__).parent))
+from utils.dataframe_utils import downcast_integer_columns, pack_dataframe, unpack_dataframe
+
+
+def test_pack_and_unpack_dataframe_round_trip():
+    """保持用に変換したDataFrameを元の内容に戻せる"""
+    df = pd.DataFrame(
+        {
+            "日付": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "勘定科目": ["売上高", None],
+            "金額": [1000, 2500],
+        }
+    )
+
+    pd.testing.assert_frame_equal(unpack_dataframe(pack_dataframe(df)), df)
+
+
+def test_unconvertible_dataframe_is_kept_as_is():
+    """Parquetにできない（文字列と数値が混在した列を含む）DataFrameはそのまま保持する"""
+    df = pd.DataFrame({"摘要": ["a", 1]}, dtype=object)
+
+    assert unpack_dataframe(pack_dataframe(df)) is df
+    assert unpack_dataframe(None) is None
+
+
+def test_downcast_integer_columns_keeps_values():
+    """整数列だけを小さい型に変換し、値と他の列は変えない"""
+    df = pd.DataFrame(
+        {
+            "small": [1, 2, 3],
+            "large": [0, 100_000, -100_000],
+            "rate": [0.1, 0.2, 0.3],
+            "name": ["a", "b", "c"],
+        }
+    )
+
+    result = downcast_integer_columns(df.copy())
+
+    assert result["small"].dtype == "int8"
+    assert result["large"].dtype == "int32"
+    assert result["rate"].dtype == "float64"
+    assert result["name"].tolist() == ["a", "b", "c"]
+    assert result["large"].tolist() == [0, 100_000, -100_000]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Excel操作ユーティリティのテスト
+"""
+
+import sys
+from datetime import date, datetime
+from io import BytesIO
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+# パスを追加してユーティリティをインポート
+sys.path.append(str(Path(__file__).parent))
+from utils import excel_utils
+from utils.excel_utils import normalize_calamine_value, slice_sheet_values
+
+requires_calamine = pytest.mark.skipif(
+    excel_utils.CalamineWorkbook is None, reason="python-calamine is not installed"
+)
+
+
+def build_workbook_bytes() -> bytes:
+    """C2から始まる表を持つワークブックを作成"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "仕訳"
+    sheet["C2"] = "日付"
+    sheet["D2"] = "金額"
+    sheet["C3"] = datetime(2024, 1, 5)
+    sheet["D3"] = 1000
+    sheet["C4"] = datetime(2024, 1, 6, 9, 30)
+    sheet["D4"] = 2.5
+    workbook.create_sheet("空")
+
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_normalize_calamine_value_matches_openpyxl_types():
+    """空文字列・整数値・日付をopenpyxlで読み込んだ場合と同じ型に揃える"""
+    assert normalize_calamine_value("") is None
+    assert normalize_calamine_value(1000.0) == 1000
+    assert isinstance(normalize_calamine_value(1000.0), int)
+    assert normalize_calamine_value(2.5) == 2.5
+    assert normalize_calamine_value(1e20) == 1e20
+    assert normalize_calamine_value(True) is True
+    assert normalize_calamine_value(date(2024, 1, 5)) == datetime(2024, 1, 5)
+
+
+def test_slice_sheet_values_pads_outside_of_sheet():
+    """シートの範囲外のセルはNoneで埋める"""
+    sheet_values = [["a", "b"], ["c", "d"]]
+
+    assert slice_sheet_values(sheet_values, 2, 3, 2, 3) == [["d", None], [None, None]]
+
+
+@requires_calamine
+def test_read_sheet_values_is_same_for_calamine_and_openpyxl(monkeypatch):
+    """python-calamineでもopenpyxlでもA1からの同じセル値を返す"""
+    workbook_data = build_workbook_bytes()
+
+    calamine_values = excel_utils.read_sheet_values(workbook_data, "仕訳")
+    monkeypatch.setattr(excel_utils, "CalamineWorkbook", None)
+    openpyxl_values = excel_utils.read_sheet_values(workbook_data, "仕訳")
+
+    assert calamine_values == openpyxl_values
+    assert calamine_values[1] == [None, None, "日付", "金額"]
+
+
+@requires_calamine
+def test_sheets_info_is_same_for_calamine_and_openpyxl():
+    """python-calamineでもopenpyxlでもA1からデータ範囲の末尾までのサイズを返す"""
+    workbook_data = build_workbook_bytes()
+
+    calamine_info = excel_utils.get_sheets_info_calamine(workbook_data)
+    openpyxl_info = excel_utils.get_sheets_info_openpyxl(workbook_data)
+
+    assert calamine_info[0] == openpyxl_info[0]
+    assert (calamine_info[0]["row_count"], calamine_info[0]["col_count"]) == (4, 4)
+    assert calamine_info[1]["has_data"] is openpyxl_info[1]["has_data"] is False
+
+
+def test_extract_table_data_builds_string_records():
+    """ヘッダー行を除いた各行を文字列のレコードにし、範囲外の列は空文字列で埋める"""
+    table_info = {
+        "range": {"start_row": 2, "end_row": 4, "start_col": 3, "end_col": 4},
+        "header_row": 2,
+        "headers": ["日付", "金額", "備考"],
+    }
+
+    result = excel_utils.extract_table_data(build_workbook_bytes(), "仕訳", table_info)
+
+    assert result["total_records"] == 2
+    assert result["records"] == [
+        {"日付": "2024-01-05 00:00:00", "金額": "1000", "備考": ""},
+        {"日付": "2024-01-06 09:30:00", "金額": "2.5", "備考": ""},
+    ]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+ファイル処理機能のテスト
+"""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# パスを追加してサービスをインポート
+sys.path.append(str(Path(__file__).parent))
+from services import file_processor
+from services.file_processor import read_csv_arrow, read_csv_bytes
+
+CSV_WITH_ISO_DATES = (
+    "日付,金額,摘要,登録日時,時刻\n"
+    "2024-01-01,100,売上,2024-01-01T10:00,10:00:00\n"
+    ",200,仕入,2024-01-02 11:00:00,11:00:00\n"
+).encode("utf-8")
+
+
+@pytest.fixture
+def full_reads(monkeypatch):
+    """全体を解析するread_csv（pandas・pyarrow）の呼び出しを記録する"""
+    pytest.importorskip("pyarrow")
+    assert file_processor.CSV_READ_ENGINE == "pyarrow"
+
+    calls = []
+    modules = (("pandas", file_processor.pd), ("pyarrow", file_processor.pyarrow.csv))
+    for name, module in modules:
+        read_csv = module.read_csv
+
+        def recording_read_csv(*args, _name=name, _read_csv=read_csv, **kwargs):
+            calls.append(_name)
+            return _read_csv(*args, **kwargs)
+
+        monkeypatch.setattr(module, "read_csv", recording_read_csv)
+    return calls
+
+
+def test_read_csv_bytes_keeps_iso_dates_as_written(full_reads):
+    """pyarrowで読み込んでも、ISO形式の日付・時刻はCパーサと同じく元の文字列のまま返す"""
+    df = read_csv_bytes(CSV_WITH_ISO_DATES)
+
+    assert full_reads == ["pyarrow"]
+    assert df.fillna("").to_dict("records") == [
+        {
+            "日付": "2024-01-01",
+            "金額": 100,
+            "摘要": "売上",
+            "登録日時": "2024-01-01T10:00",
+            "時刻": "10:00:00",
+        },
+        {
+            "日付": "",
+            "金額": 200,
+            "摘要": "仕入",
+            "登録日時": "2024-01-02 11:00:00",
+            "時刻": "11:00:00",
+        },
+    ]
+
+
+def test_read_csv_bytes_skips_rows_before_header(full_reads):
+    """ヘッダー行より前の行を読み飛ばし、Cパーサと同じ結果をpyarrowの1回の解析で返す"""
+    csv_content = (
+        "仕訳一覧,,\n"
+        "科目,金額,日付\n"
+        "売上,100,2024-01-01\n"
+        "仕入,200,2024-01-02\n"
+    ).encode("utf-8")
+
+    df = read_csv_bytes(csv_content, skiprows=1)
+
+    assert full_reads == ["pyarrow"]
+    pd.testing.assert_frame_equal(df, pd.read_csv(BytesIO(csv_content), skiprows=1))
+
+
+def test_read_csv_arrow_matches_pandas_pyarrow_engine():
+    """欠損値と全て欠損値の列の扱いはpandasのpyarrowエンジンと同じになる"""
+    pytest.importorskip("pyarrow")
+    csv_content = (
+        "科目,金額,備考,空列\n"
+        "売上,100,None,\n"
+        "NA,,<NA>,\n"
+        "仕入,1.5,n/a,\n"
+    ).encode("utf-8")
+
+    actual = read_csv_arrow(csv_content, 0, [])
+    expected = pd.read_csv(BytesIO(csv_content), engine="pyarrow")
+
+    pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+セッション管理のテスト
+"""
+
+import sys
+import asyncio
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+
+import openpyxl
+
+# パスを追加してサービスをインポート
+sys.path.append(str(Path(__file__).parent))
+from services.session_manager import SessionManager
+from utils import excel_utils
+
+
+class FakeClockSessionManager(SessionManager):
+    """現在時刻をテストから進められるセッション管理"""
+
+    def __init__(self, timeout_minutes: int = 30, max_sessions: int = 128):
+        super().__init__(timeout_minutes, max_sessions)
+        self.now = datetime(2024, 1, 1, 9, 0, 0)
+
+    def get_current_time(self) -> datetime:
+        return self.now
+
+
+def test_expired_sessions_are_cleaned_up():
+    """最終アクセスからタイムアウトを過ぎたセッションだけが削除される"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    manager.create_session("old")
+    manager.now += timedelta(minutes=20)
+    manager.create_session("new")
+
+    manager.now += timedelta(minutes=11)
+
+    assert manager.cleanup_expired_sessions() == 1
+    assert manager.get_session("old") is None
+    assert manager.get_session("new") is not None
+
+
+def test_accessed_session_is_kept_alive():
+    """期限切れ予定時刻の前にアクセスされたセッションは期限が延びる"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    manager.create_session("session")
+
+    manager.now += timedelta(minutes=25)
+    assert manager.get_session("session") is not None
+
+    manager.now += timedelta(minutes=25)
+    assert manager.cleanup_expired_sessions() == 0
+    assert manager.get_session("session") is not None
+
+    manager.now += timedelta(minutes=31)
+    assert manager.cleanup_expired_sessions() == 1
+    assert manager.list_active_sessions() == []
+
+
+def test_deleted_session_is_skipped_by_cleanup():
+    """削除済みのセッションは期限切れとして数えない"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    manager.create_session("session")
+    assert manager.delete_session("session")
+
+    manager.now += timedelta(minutes=31)
+
+    assert manager.cleanup_expired_sessions() == 0
+    assert manager.timestamps == {}
+
+
+def test_expired_session_is_hidden_before_cleanup_runs():
+    """バックグラウンドのクリーンアップ前でも期限切れのセッションは返さない"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    manager.create_session("session")
+
+    manager.now += timedelta(minutes=31)
+
+    assert manager.get_session("session") is None
+    assert manager.list_active_sessions() == []
+    assert "session" in manager.sessions
+
+
+def test_run_cleanup_loop_removes_expired_sessions():
+    """定期クリーンアップのタスクが期限切れのセッションを削除する"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    manager.create_session("session")
+    manager.now += timedelta(minutes=31)
+
+    async def run():
+        task = asyncio.create_task(manager.run_cleanup_loop(interval_seconds=0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+
+    assert manager.sessions == {}
+
+
+def test_least_recently_used_session_is_evicted_over_capacity():
+    """上限を超えると最も長くアクセスされていないセッションから破棄される"""
+    manager = FakeClockSessionManager(timeout_minutes=30, max_sessions=2)
+    manager.create_session("first")
+    manager.create_session("second")
+    assert manager.get_session("first") is not None
+
+    manager.create_session("third")
+
+    assert manager.get_session("second") is None
+    assert manager.get_session("first") is not None
+    assert manager.get_session("third") is not None
+    assert len(manager.timestamps) == 2
+
+    manager.now += timedelta(minutes=31)
+    assert manager.cleanup_expired_sessions() == 2
+
+
+def test_cleanup_stops_at_first_fresh_session():
+    """更新されたセッションは末尾に移り、それより古いセッションだけが削除される"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    manager.create_session("first")
+    manager.create_session("second")
+    manager.now += timedelta(minutes=20)
+    assert manager.save_session_data("first", {"metadata": {"step": 1}})
+
+    manager.now += timedelta(minutes=11)
+
+    assert manager.cleanup_expired_sessions() == 1
+    assert list(manager.sessions) == ["first"]
+
+
+def cache_workbook(title: str) -> bytes:
+    """シートのセル値をキャッシュに読み込んだワークブックのハッシュを返す"""
+    workbook = openpyxl.Workbook()
+    workbook.active.title = title
+    workbook.active["A1"] = title
+    buffer = BytesIO()
+    workbook.save(buffer)
+    workbook_data = buffer.getvalue()
+
+    excel_utils.load_sheet_values_cached(workbook_data, title)
+    return excel_utils.content_digest(workbook_data)
+
+
+def cached_digests() -> set:
+    """シートのセル値のキャッシュに残っているハッシュ"""
+    return {digest for digest, _ in excel_utils._sheet_values_cache}
+
+
+def test_removed_sessions_evict_cached_workbook_results():
+    """削除・期限切れのセッションのファイルの解析結果はキャッシュから破棄される"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    deleted_digest = cache_workbook("削除")
+    expired_digest = cache_workbook("期限切れ")
+    manager.create_session("deleted")["content_digest"] = deleted_digest
+    manager.create_session("expired")["content_digest"] = expired_digest
+
+    assert manager.delete_session("deleted")
+    assert deleted_digest not in cached_digests()
+    assert expired_digest in cached_digests()
+
+    manager.now += timedelta(minutes=31)
+    assert manager.cleanup_expired_sessions() == 1
+    assert expired_digest not in cached_digests()
+
+
+def test_cached_results_shared_with_live_session_are_kept():
+    """同じ内容のファイルを参照するセッションが残っていればキャッシュを破棄しない"""
+    manager = FakeClockSessionManager(timeout_minutes=30)
+    digest = cache_workbook("共有")
+    manager.create_session("first")["content_digest"] = digest
+    manager.create_session("second")["content_digest"] = digest
+
+    assert manager.delete_session("first")
+    assert digest in cached_digests()
+
+    assert manager.delete_session("second")
+    assert digest not in cached_digests()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+統計的表検出器のテスト
+"""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pytest
+
+# パスを追加してサービスをインポート
+sys.path.append(str(Path(__file__).parent))
+from services import table_detector
+from services.table_detector import (
+    CELL_DATE,
+    CELL_EMPTY,
+    CELL_NUMERIC,
+    CELL_STRING,
+    StatisticalTableDetector,
+    classify_cells,
+)
+
+
+def build_two_table_sheet():
+    """1行の空行を挟む表と、2行以上離れた別の表を持つシートを作成"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "仕訳"
+
+    sheet.append(["日付", "勘定科目", "金額"])
+    sheet.append(["2024/01/01", "売上高", 1000])
+    sheet.append([])
+    sheet.append(["2024/01/02", "売上高", 2000])
+    sheet.append(["2024/01/03", "仕入高", 500])
+    sheet.append([])
+    sheet.append([])
+    sheet.append([None, None, None, "部門", "担当者"])
+    sheet.append([None, None, None, "営業部", "山田"])
+    sheet.append([None, None, None, "総務部", "佐藤"])
+    return workbook
+
+
+def test_find_data_regions_splits_tables_separated_by_blank_rows():
+    """1行の空行はまたいで1つの領域とし、2行以上空いた領域は別の表にする"""
+    sheet_values = [list(row) for row in build_two_table_sheet().active.values]
+
+    assert StatisticalTableDetector()._find_data_regions(sheet_values) == [
+        {"start_row": 1, "end_row": 5, "start_col": 1, "end_col": 3},
+        {"start_row": 8, "end_row": 10, "start_col": 4, "end_col": 5},
+    ]
+
+
+def test_label_data_regions_fallback_matches_scipy(monkeypatch):
+    """scipyがない場合の幅優先探索もndimageと同じ外接矩形を同じ順で返す"""
+    if table_detector.ndimage is None:
+        pytest.skip("scipy is not installed")
+
+    rng = np.random.default_rng(0)
+    masks = [rng.random((40, 30)) < density for density in (0.1, 0.3, 0.5)]
+
+    expected = [StatisticalTableDetector._label_data_regions(m) for m in masks]
+    monkeypatch.setattr(table_detector, "ndimage", None)
+    actual = [StatisticalTableDetector._label_data_regions(m) for m in masks]
+
+    assert actual == expected
+
+
+def test_classify_cells_tags_each_cell_once():
+    """日付のタグは数値とみなせない値だけに付ける"""
+    cell_texts = np.array(
+        [["", "1,000", "2024/01/05"], ["20240105", "科目", "１２"]], dtype=object
+    )
+
+    assert classify_cells(cell_texts).tolist() == [
+        [CELL_EMPTY, CELL_NUMERIC, CELL_DATE],
+        [CELL_NUMERIC, CELL_STRING, CELL_NUMERIC],
+    ]
+
+
+def test_detect_tables_from_workbook_bytes():
+    """ワークブックのバイト列から表候補とヘッダーを検出する"""
+    buffer = BytesIO()
+    build_two_table_sheet().save(buffer)
+
+    candidates = StatisticalTableDetector().detect_tables(buffer.getvalue(), "仕訳")
+
+    assert len(candidates) == 2
+    headers = sorted(candidate.headers for candidate in candidates)
+    assert headers == [["日付", "勘定科目", "金額"], ["部門", "担当者"]]
+
+
+def test_detect_tables_reuses_result_for_same_input(monkeypatch):
+    """同じファイル・シート・条件の再検出ではシートを読み直さずに前回の結果を返す"""
+    buffer = BytesIO()
+    build_two_table_sheet().save(buffer)
+    workbook_data = buffer.getvalue()
+
+    load_calls = []
+    load_sheet_values = table_detector.load_sheet_values_cached
+
+    def counting_load(data, sheet_name):
+        load_calls.append(sheet_name)
+        return load_sheet_values(data, sheet_name)
+
+    monkeypatch.setattr(table_detector, "load_sheet_values_cached", counting_load)
+    detector = StatisticalTableDetector()
+
+    first = detector.detect_tables(workbook_data, "仕訳")
+    second = detector.detect_tables(workbook_data, "仕訳")
+    limited = detector.detect_tables(workbook_data, "仕訳", max_tables=1)
+
+    assert second == first
+    assert len(limited) == 1
+    assert load_calls == ["仕訳", "仕訳"]
+
+
+def test_evict_detection_cache_drops_results_for_digest(monkeypatch):
+    """セッション破棄時に呼ばれる破棄処理の後は、同じファイルでもシートを読み直して検出する"""
+    buffer = BytesIO()
+    build_two_table_sheet().save(buffer)
+    workbook_data = buffer.getvalue()
+
+    load_calls = []
+    load_sheet_values = table_detector.load_sheet_values_cached
+
+    def counting_load(data, sheet_name):
+        load_calls.append(sheet_name)
+        return load_sheet_values(data, sheet_name)
+
+    monkeypatch.setattr(table_detector, "load_sheet_values_cached", counting_load)
+    detector = StatisticalTableDetector()
+
+    first = detector.detect_tables(workbook_data, "仕訳")
+    table_detector.evict_detection_cache(table_detector.content_digest(workbook_data))
+    second = detector.detect_tables(workbook_data, "仕訳")
+
+    assert [c.to_dict() for c in second] == [c.to_dict() for c in first]
+    assert load_calls == ["仕訳", "仕訳"]
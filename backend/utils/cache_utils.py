@@ -0,0 +1,48 @@
+"""
+キャッシュ関連のユーティリティ関数
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def async_ttl_cache(
+    ttl_seconds: float,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    非同期関数の成功結果を一定時間キャッシュするデコレーター
+
+    ヘルスチェックのように短い間隔で繰り返し呼ばれるエンドポイント向け。
+    TTL内の呼び出しは実処理を行わずに前回の結果を返す。
+    例外が発生した場合はキャッシュせず、次の呼び出しで再実行する。
+    """
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        cache: Dict[Tuple[Any, ...], Tuple[float, T]] = {}
+        lock = asyncio.Lock()
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            key = (args, tuple(sorted(kwargs.items())))
+
+            cached = cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < ttl_seconds:
+                return cached[1]
+
+            # 同時に期限切れを検知したリクエストは1回の実処理にまとめる
+            async with lock:
+                cached = cache.get(key)
+                if cached is not None and time.monotonic() - cached[0] < ttl_seconds:
+                    return cached[1]
+
+                result = await func(*args, **kwargs)
+                cache[key] = (time.monotonic(), result)
+                return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,61 @@
+"""
+DataFrameの保持・変換のユーティリティ関数
+"""
+
+import logging
+from io import BytesIO
+from typing import Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# pyarrowがあればセッションに保持するDataFrameをParquet（zstd圧縮）のバイト列にする
+try:
+    import pyarrow  # noqa: F401
+
+    SESSION_FRAME_FORMAT: Optional[str] = "parquet"
+except ImportError:
+    SESSION_FRAME_FORMAT = None
+
+# セッションに保持するDataFrame（Parquetのバイト列、または変換できなかったDataFrameそのもの）
+StoredFrame = Union[bytes, pd.DataFrame]
+
+
+def downcast_integer_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    整数列を値の範囲に収まる最小の整数型（int8/int16/int32など）に変換
+
+    浮動小数点列はfloat32にすると値そのものが変わるため対象外とする
+    """
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def pack_dataframe(df: pd.DataFrame) -> StoredFrame:
+    """
+    セッションに保持するためにDataFrameをParquetのバイト列に変換
+
+    列ごとの連続したバッファに圧縮されるため、Pythonオブジェクトを抱えたDataFrameより小さく保持できる。
+    pyarrowがない場合や、Parquetにできない列（文字列と数値が混在した列など）を含む場合は
+    DataFrameをそのまま返す
+    """
+    if SESSION_FRAME_FORMAT is None:
+        return df
+
+    buffer = BytesIO()
+    try:
+        df.to_parquet(buffer, engine="pyarrow", compression="zstd")
+    except Exception as e:
+        logger.debug("Parquet conversion failed, keeping DataFrame: %s", e)
+        return df
+    return buffer.getvalue()
+
+
+def unpack_dataframe(stored: Optional[StoredFrame]) -> Optional[pd.DataFrame]:
+    """pack_dataframeで保持した値をDataFrameに戻す"""
+    if stored is None or isinstance(stored, pd.DataFrame):
+        return stored
+
+    return pd.read_parquet(BytesIO(stored), engine="pyarrow")
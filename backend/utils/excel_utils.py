@@ -2,70 +2,290 @@
 Excel操作のユーティリティ関数
 """
 
+import hashlib
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 from io import BytesIO
+from itertools import zip_longest
 import openpyxl
-import pandas as pd
 from fastapi import HTTPException
+from openpyxl.workbook.workbook import Workbook
+
+# python-calamine（Rust実装のxlsx/xlsパーサ）があればシート情報の取得に使う
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# blake3（SIMD実装のハッシュ）があればアップロード内容のハッシュに使い、なければblake2bで代替する。
+# ハッシュはセッションをまたいで共有するキャッシュのキーになるため、衝突を作れない暗号学的ハッシュを使う
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
 
 logger = logging.getLogger(__name__)
 
+# 解析済みワークブックを保持する件数（python-calamineがない場合のセル値の読み込みに使う）
+WORKBOOK_CACHE_SIZE = 8
+
+_workbook_cache: "OrderedDict[bytes, Workbook]" = OrderedDict()
+_workbook_cache_lock = threading.Lock()
+
+# シートのセル値（行のリスト）を保持する件数（同じアップロードに対する表検出・表抽出で再利用する）
+SHEET_VALUES_CACHE_SIZE = 16
+
+_sheet_values_cache: "OrderedDict[Tuple[bytes, str], List[List[Any]]]" = OrderedDict()
+_sheet_values_cache_lock = threading.Lock()
+
+
+def content_digest(data: bytes) -> bytes:
+    """ファイル内容の16バイトのハッシュを返す"""
+    if blake3 is not None:
+        return blake3(data).digest(length=16)
+
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def load_workbook_cached(workbook_data: bytes) -> Workbook:
+    """
+    ワークブックを読み込む（内容のハッシュが同じなら前回の解析結果を再利用する）
+
+    セル単位のランダムアクセスが速い通常モードで読み込む。
+    キャッシュしたワークブックは複数のリクエストで共有されるため、呼び出し側で閉じたり変更したりしない
+    """
+    digest = content_digest(workbook_data)
+
+    with _workbook_cache_lock:
+        workbook = _workbook_cache.get(digest)
+        if workbook is not None:
+            _workbook_cache.move_to_end(digest)
+            return workbook
+
+    # 数式のセルはpython-calamineと同じくExcelが保存した計算結果の値で読み込む
+    workbook = openpyxl.load_workbook(
+        BytesIO(workbook_data), read_only=False, data_only=True
+    )
+
+    with _workbook_cache_lock:
+        _workbook_cache[digest] = workbook
+        _workbook_cache.move_to_end(digest)
+        while len(_workbook_cache) > WORKBOOK_CACHE_SIZE:
+            _workbook_cache.popitem(last=False)
+
+    return workbook
+
+
+def evict_workbook_cache(digest: bytes) -> None:
+    """
+    指定したハッシュのワークブックとシートのセル値をキャッシュから破棄する
+
+    セッションの削除・期限切れ時に呼び出し、不要になった解析結果をプロセスに残さない
+    """
+    with _workbook_cache_lock:
+        _workbook_cache.pop(digest, None)
+
+    with _sheet_values_cache_lock:
+        for key in [key for key in _sheet_values_cache if key[0] == digest]:
+            del _sheet_values_cache[key]
+
+
+def normalize_calamine_value(value: Any) -> Any:
+    """
+    python-calamineのセル値をopenpyxlで読み込んだ場合と同じ型に揃える
+
+    空セルの空文字列はNone、整数値の浮動小数点数はint、日付はdatetimeにする。
+    Excelが指数表記で保存する15桁以上の数値はopenpyxlと同じくfloatのままにする
+    """
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return int(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time())
+    return value
+
+
+def read_sheet_values(workbook_data: bytes, sheet_name: str) -> List[List[Any]]:
+    """
+    シートのA1からデータ範囲の末尾までのセル値を行のリストとして読み込む
+
+    python-calamineがあればそちらで読み込み、なければキャッシュしたopenpyxlのワークブックから取り出す
+    """
+    if CalamineWorkbook is not None:
+        try:
+            workbook = CalamineWorkbook.from_filelike(BytesIO(workbook_data))
+            sheet = workbook.get_sheet_by_name(sheet_name)
+            rows = sheet.to_python(skip_empty_area=False)
+            return [[normalize_calamine_value(value) for value in row] for row in rows]
+        except Exception as e:
+            logger.debug("calamine sheet read failed, falling back: %s", e)
+
+    sheet = load_workbook_cached(workbook_data)[sheet_name]
+    return [list(row) for row in sheet.values]
+
+
+def load_sheet_values_cached(workbook_data: bytes, sheet_name: str) -> List[List[Any]]:
+    """
+    シートのセル値を読み込む（内容のハッシュとシート名が同じなら前回の結果を再利用する）
+
+    表検出と表抽出で共有されるため、呼び出し側で変更しない
+    """
+    key = (content_digest(workbook_data), sheet_name)
+
+    with _sheet_values_cache_lock:
+        sheet_values = _sheet_values_cache.get(key)
+        if sheet_values is not None:
+            _sheet_values_cache.move_to_end(key)
+            return sheet_values
+
+    sheet_values = read_sheet_values(workbook_data, sheet_name)
+
+    with _sheet_values_cache_lock:
+        _sheet_values_cache[key] = sheet_values
+        _sheet_values_cache.move_to_end(key)
+        while len(_sheet_values_cache) > SHEET_VALUES_CACHE_SIZE:
+            _sheet_values_cache.popitem(last=False)
+
+    return sheet_values
+
+
+def slice_sheet_values(
+    sheet_values: List[List[Any]],
+    start_row: int,
+    end_row: int,
+    start_col: int,
+    end_col: int,
+) -> List[List[Any]]:
+    """1始まりの行・列番号で指定した範囲のセル値を取り出す（シートの範囲外はNoneで埋める）"""
+    width = end_col - start_col + 1
+    region = []
+    for row in range(start_row, end_row + 1):
+        row_values = (
+            sheet_values[row - 1][start_col - 1 : end_col]
+            if row <= len(sheet_values)
+            else []
+        )
+        region.append(list(row_values) + [None] * (width - len(row_values)))
+    return region
+
+
+# データの有無を確認するためにサンプリングする範囲
+SHEET_SAMPLE_ROWS = 100
+SHEET_SAMPLE_COLS = 20
+
+
+def build_sheet_info(
+    sheet_name: str, max_row: int, max_col: int, sample_values: Iterable[Sequence[Any]]
+) -> Dict[str, Any]:
+    """シートのサイズと先頭のサンプル値からシート情報を作成"""
+    sample_rows = min(SHEET_SAMPLE_ROWS, max_row)
+    sample_cols = min(SHEET_SAMPLE_COLS, max_col)
+
+    data_cells = 0
+    if sample_rows > 0 and sample_cols > 0:
+        for row_values in sample_values:
+            # 文字列以外の値はstr()で変換せずにデータありと数える
+            data_cells += sum(
+                1
+                for cell_value in row_values[:sample_cols]
+                if cell_value is not None
+                and (not isinstance(cell_value, str) or cell_value.strip())
+            )
+    has_data = data_cells > 0
+
+    # データ密度を計算
+    total_sample_cells = sample_rows * sample_cols
+    data_density = data_cells / total_sample_cells if total_sample_cells > 0 else 0
+
+    # データ範囲を推定
+    data_range = None
+    if has_data:
+        data_range = f"A1:{openpyxl.utils.get_column_letter(max_col)}{max_row}"
+
+    return {
+        "name": sheet_name,
+        "row_count": max_row,
+        "col_count": max_col,
+        "has_data": has_data,
+        "data_range": data_range,
+        "data_density": round(data_density, 3),
+        "estimated_data_cells": data_cells,
+    }
+
+
+def get_sheets_info_calamine(file_content: bytes) -> List[Dict[str, Any]]:
+    """python-calamineでシート情報を取得（.xlsも読み込める）"""
+    workbook = CalamineWorkbook.from_filelike(BytesIO(file_content))
+    sheets_info = []
+
+    for sheet_name in workbook.sheet_names:
+        sheet = workbook.get_sheet_by_name(sheet_name)
+
+        # endはデータ範囲の末尾のセルの0始まりの位置（空のシートではNone）
+        max_row, max_col = (sheet.end[0] + 1, sheet.end[1] + 1) if sheet.end else (0, 0)
+        sample_values = (
+            sheet.to_python(skip_empty_area=False, nrows=SHEET_SAMPLE_ROWS)
+            if max_row and max_col
+            else []
+        )
+        sheets_info.append(build_sheet_info(sheet_name, max_row, max_col, sample_values))
+
+    return sheets_info
+
+
+def get_sheets_info_openpyxl(file_content: bytes) -> List[Dict[str, Any]]:
+    """openpyxlの読み取り専用モードでシート情報を取得"""
+    workbook = openpyxl.load_workbook(BytesIO(file_content), read_only=True)
+    sheets_info = []
+
+    for sheet_name in workbook.sheetnames:
+        sheet = workbook[sheet_name]
+
+        # シートの最大行・列を取得（dimension情報のないシートは全行を走査して求める）
+        if not (sheet.max_row and sheet.max_column):
+            try:
+                sheet.calculate_dimension(force=True)
+            except Exception:
+                # 行が1つもないシートではopenpyxlが例外を送出するため、サイズ0として扱う
+                pass
+        max_row = sheet.max_row or 0
+        max_col = sheet.max_column or 0
+
+        # read_onlyモードでのcell()はXMLを再解析するため、iter_rowsで1回だけ読み進める
+        sample_values = (
+            sheet.iter_rows(
+                min_row=1,
+                max_row=min(SHEET_SAMPLE_ROWS, max_row),
+                max_col=min(SHEET_SAMPLE_COLS, max_col),
+                values_only=True,
+            )
+            if max_row and max_col
+            else []
+        )
+        sheets_info.append(build_sheet_info(sheet_name, max_row, max_col, sample_values))
+
+    workbook.close()
+    return sheets_info
+
 
 def get_excel_sheets_info(file_content: bytes) -> List[Dict[str, Any]]:
-    """Excelファイルからシート情報を取得"""
+    """
+    Excelファイルからシート情報を取得
+
+    python-calamineがあればそちらで読み込み、読み込めない場合はopenpyxlで読み直す
+    """
     try:
-        workbook = openpyxl.load_workbook(BytesIO(file_content), read_only=True)
-        sheets_info = []
-
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-
-            # シートの最大行・列を取得
-            max_row = sheet.max_row
-            max_col = sheet.max_column
-
-            # データの有無を確認（最初の100行をサンプリング）
-            has_data = False
-            data_cells = 0
-            sample_rows = min(100, max_row) if max_row else 0
-            sample_cols = min(20, max_col) if max_col else 0
-
-            if sample_rows > 0 and sample_cols > 0:
-                for row in range(1, sample_rows + 1):
-                    for col in range(1, sample_cols + 1):
-                        cell_value = sheet.cell(row, col).value
-                        if cell_value is not None and str(cell_value).strip() != "":
-                            data_cells += 1
-                            has_data = True
-
-                # データ密度を計算
-                total_sample_cells = sample_rows * sample_cols
-                data_density = (
-                    data_cells / total_sample_cells if total_sample_cells > 0 else 0
-                )
-            else:
-                data_density = 0
-
-            # データ範囲を推定
-            data_range = None
-            if has_data and max_row > 0 and max_col > 0:
-                end_col_letter = openpyxl.utils.get_column_letter(max_col)
-                data_range = f"A1:{end_col_letter}{max_row}"
-
-            sheet_info = {
-                "name": sheet_name,
-                "row_count": max_row if max_row else 0,
-                "col_count": max_col if max_col else 0,
-                "has_data": has_data,
-                "data_range": data_range,
-                "data_density": round(data_density, 3),
-                "estimated_data_cells": data_cells,
-            }
-            sheets_info.append(sheet_info)
+        if CalamineWorkbook is not None:
+            try:
+                return get_sheets_info_calamine(file_content)
+            except Exception as e:
+                logger.debug("calamine sheet scan failed, falling back: %s", e)
 
-        workbook.close()
-        return sheets_info
+        return get_sheets_info_openpyxl(file_content)
 
     except Exception as e:
         logger.error(f"Error reading Excel sheets: {str(e)}")
@@ -80,8 +300,7 @@ def extract_table_data(
 ) -> Dict[str, Any]:
     """指定された表の全データを抽出する"""
     try:
-        workbook = openpyxl.load_workbook(BytesIO(workbook_data))
-        sheet = workbook[sheet_name]
+        sheet_values = load_sheet_values_cached(workbook_data, sheet_name)
 
         range_info = table_info["range"]
         start_row = range_info["start_row"]
@@ -92,40 +311,24 @@ def extract_table_data(
         headers = table_info.get("headers", [])
 
         # 全データを収集
-        all_data = []
-        for row in range(start_row, end_row + 1):
-            row_data = []
-            for col in range(start_col, end_col + 1):
-                cell_value = sheet.cell(row, col).value
-                row_data.append(cell_value)
-            all_data.append(row_data)
-
-        # ヘッダー行がある場合はデータ部分のみ抽出
-        records = []
+        all_data = slice_sheet_values(
+            sheet_values, start_row, end_row, start_col, end_col
+        )
+
+        # ヘッダー行がある場合はデータ部分のみ抽出（範囲外の列はヘッダーに対して空文字列で埋める）
         data_start_idx = 1 if header_row else 0
+        records = [
+            {
+                header: "" if value is None else str(value)
+                for header, value in zip_longest(headers, row_values[: len(headers)])
+            }
+            for row_values in all_data[data_start_idx:]
+        ]
 
-        for row_idx in range(data_start_idx, len(all_data)):
-            record = {}
-            for col_idx, header in enumerate(headers):
-                if col_idx < len(all_data[row_idx]):
-                    value = all_data[row_idx][col_idx]
-                    record[header] = str(value) if value is not None else ""
-                else:
-                    record[header] = ""
-            records.append(record)
-
-        # データ型分析（サービスからインポートを避けるため簡易実装）
-        if records:
-            df = pd.DataFrame(records)
-            # data_types とquality_reportは別のモジュールから取得すべきだが、
-            # 循環インポートを避けるため、ここでは簡易的に空のdictを返す
-            data_types = {}
-            quality_report = {}
-        else:
-            data_types = {}
-            quality_report = {}
-
-        workbook.close()
+        # data_types とquality_reportは別のモジュールから取得すべきだが、
+        # 循環インポートを避けるため、ここでは簡易的に空のdictを返す
+        data_types = {}
+        quality_report = {}
 
         return {
             "headers": headers,
@@ -0,0 +1,50 @@
+"""
+ログ設定のユーティリティ関数
+"""
+
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    """
+    ルートロガーをキュー経由の非同期出力に設定する
+
+    リクエスト処理側はレコードをキューに積むだけにし、
+    フォーマットと標準出力への書き込みはQueueListenerのバックグラウンドスレッドで行う。
+    ログレベルは環境変数LOG_LEVELで指定（デフォルトはINFO）
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    # import時にlogging.basicConfigで追加されたハンドラーを置き換え、二重出力を防ぐ
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """キューに残ったログを書き出してバックグラウンドスレッドを停止する"""
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    _listener = None